@@ -7,14 +7,13 @@ from sqlalchemy.orm import Session
 from app.models.candidate import Candidate, Base
 from app.database import engine, SessionLocal, get_db
 from app.workflow import run_workflow_with_visualization
+from app.extraction import extract_uploads, shutdown_extraction_pool
 import logging
-import io
+import time
 import uuid
 from dotenv import load_dotenv
 import re
-from docx import Document
 import csv
-import pymupdf
 from typing import List
 
 # Set up logging
@@ -33,6 +32,10 @@ Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
 
+@app.on_event("shutdown")
+def stop_extraction_workers():
+    shutdown_extraction_pool()
+
 # Initialize the OpenAI GPT-4 model
 try:
     llm = ChatOpenAI(
@@ -148,7 +151,7 @@ async def upload_resumes(files: List[UploadFile] = File(...), db: Session = Depe
     task_id = str(uuid.uuid4())
 
     try:
-        # Step 1: Extract content from uploaded files using pymupdf directly
+        # Step 1: Extract content from uploaded files in worker processes, keeping the event loop free
         state = AppState(
             task_id=task_id,
             resumes=[],
@@ -159,28 +162,20 @@ async def upload_resumes(files: List[UploadFile] = File(...), db: Session = Depe
             db=db
         )
 
-        for file in files:
-            content = await file.read()
-            file_like = io.BytesIO(content)
-
-            try:
-                if file.filename.lower().endswith('.pdf'):
-                    doc = pymupdf.open(stream=content, filetype="pdf")
-                    text = ""
-                    for page in doc:
-                        text += page.get_text()
-                    doc.close()
-                elif file.filename.lower().endswith('.docx'):
-                    doc = Document(file_like)
-                    text = "\n".join([para.text for para in doc.paragraphs])
-                else:
-                    logger.error(f"Unsupported file format: {file.filename}")
-                    continue
-
-                state["resumes"].append({"file_name": file.filename, "content": text})
-            except Exception as e:
-                logger.error(f"Failed to extract content from {file.filename}: {str(e)}")
-                continue
+        extraction_start = time.perf_counter()
+        extracted = await extract_uploads(files, logger)
+        extraction_timings = []
+        for result in extracted:
+            if result["status"] == "ok":
+                state["resumes"].append({"file_name": result["file_name"], "content": result["content"]})
+            extraction_timings.append({
+                "file_name": result["file_name"],
+                "status": result["status"],
+                "seconds": round(result["seconds"], 3),
+                "extract_seconds": round(result.get("extract_seconds", 0.0), 3)
+            })
+        logger.info(f"Extracted {len(state['resumes'])}/{len(files)} resumes in "
+                    f"{time.perf_counter() - extraction_start:.2f}s")
 
         if not state["resumes"]:
             raise HTTPException(status_code=400, detail="No valid resumes uploaded")
@@ -219,6 +214,7 @@ async def upload_resumes(files: List[UploadFile] = File(...), db: Session = Depe
             "task_id": task_id,
             "resumes": resumes_data,
             "processed": processed_candidates,
+            "extraction": extraction_timings,
             "intermediate_states": {
                 "parsed_resumes": final_state.get("parsed_resumes", []),
                 "classified_candidates": final_state.get("classified_candidates", []),
@@ -0,0 +1,124 @@
+import asyncio
+import io
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pymupdf
+from docx import Document
+
+# Worker processes for PDF/DOCX parsing (CPU-bound, so kept off the event loop)
+MAX_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 1))
+
+# Files read into memory and queued for extraction at once per request
+MAX_CONCURRENT_FILES = int(os.getenv("EXTRACTION_CONCURRENCY", MAX_WORKERS * 2))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+
+def extract_text(file_name: str, content: bytes) -> dict:
+    """Extract plain text from a PDF or DOCX resume. Runs in a worker process, so it must stay top-level."""
+    start = time.perf_counter()
+    lower_name = file_name.lower()
+    if lower_name.endswith('.pdf'):
+        with pymupdf.open(stream=content, filetype="pdf") as doc:
+            # One join instead of repeated += keeps long CVs linear in their size
+            text = "".join(page.get_text() for page in doc)
+    elif lower_name.endswith('.docx'):
+        doc = Document(io.BytesIO(content))
+        text = "\n".join(para.text for para in doc.paragraphs)
+    else:
+        raise UnsupportedFormatError(f"Unsupported file format: {file_name}")
+    return {"file_name": file_name, "content": text, "extract_seconds": time.perf_counter() - start}
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Process-wide pool, created on first use and shared by all requests."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _pool
+
+
+def shutdown_extraction_pool(pool: ProcessPoolExecutor = None):
+    """Shut down the shared pool, or only `pool` if it is still the shared one."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or (pool is not None and pool is not _pool):
+            # Already replaced after the same crash, by another file of this or another request
+            return
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _extract_in_pool(file_name: str, content: bytes) -> dict:
+    """Run extract_text on the shared pool; if that pool breaks, retry once in a worker of its own.
+
+    A crashed worker breaks the whole pool, so files running or queued next to
+    the one that crashed it fail or are cancelled with it. The retry runs the
+    file alone, so a second crash is down to that file and fails only it.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_extraction_pool()
+    try:
+        return await loop.run_in_executor(pool, extract_text, file_name, content)
+    except BrokenProcessPool:
+        shutdown_extraction_pool(pool)
+    except asyncio.CancelledError:
+        # Cancelled by the shutdown of a broken pool, not by the request being cancelled
+        with _pool_lock:
+            if pool is _pool:
+                raise
+    isolated_pool = ProcessPoolExecutor(max_workers=1)
+    try:
+        return await loop.run_in_executor(isolated_pool, extract_text, file_name, content)
+    finally:
+        # Without waiting, so a cancelled request never blocks the event loop on the worker
+        isolated_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def extract_uploads(files, logger) -> list:
+    """Read and extract every upload with at most MAX_CONCURRENT_FILES in flight.
+
+    Returns one dict per file, in upload order: file_name, status ("ok",
+    "unsupported" or "failed"), seconds (read to result, including time queued for a worker),
+    extract_seconds (parsing time in the worker) and content, or error.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FILES)
+
+    async def extract_one(file):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                # Rejected before reading, so unsupported uploads never reach a worker
+                if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    raise UnsupportedFormatError(f"Unsupported file format: {file.filename}")
+                content = await file.read()
+                result = await _extract_in_pool(file.filename, content)
+                result["status"] = "ok"
+            except UnsupportedFormatError as e:
+                logger.error(str(e))
+                result = {"file_name": file.filename, "status": "unsupported", "error": str(e)}
+            except BrokenProcessPool as e:
+                # The worker died on this file alone (e.g. a malformed PDF)
+                logger.error(f"Extraction worker crashed on {file.filename}: {str(e)}")
+                result = {"file_name": file.filename, "status": "failed", "error": "extraction worker crashed"}
+            except Exception as e:
+                logger.error(f"Failed to extract content from {file.filename}: {str(e)}")
+                result = {"file_name": file.filename, "status": "failed", "error": str(e)}
+            result["seconds"] = time.perf_counter() - start
+            logger.info(f"Extracted {file.filename} ({result['status']}) in {result['seconds']:.3f}s")
+            return result
+
+    return await asyncio.gather(*(extract_one(file) for file in files))
@@ -0,0 +1,250 @@
+# ann_index.py
+import argparse
+import json
+import math
+import os
+import time
+import uuid
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+# Written next to index.faiss so the retriever knows how to tune the loaded index
+INDEX_CONFIG_FILE = "index_config.json"
+
+INDEX_TYPES = ("flat", "ivfpq", "hnsw", "sq8", "pq")
+
+# Lossy index types; their full-precision vectors are kept on disk for re-scoring
+QUANTIZED_TYPES = ("ivfpq", "sq8", "pq")
+
+# Types whose remove_ids compacts the remaining rows in order, which LangChain's FAISS.delete assumes.
+# IVF keeps the old ids and HNSW cannot remove at all, so those need a rebuild.
+UPDATABLE_TYPES = ("flat", "sq8", "pq")
+
+# float32 vectors in index row order, memory-mapped by the retriever
+FULL_VECTORS_FILE = "vectors.npy"
+
+# Quantized searches fetch this many times k candidates before exact re-scoring
+RESCORE_OVERSAMPLE = 4
+
+
+def _largest_divisor_at_most(d, limit):
+    for m in range(max(1, min(d, limit)), 0, -1):
+        if d % m == 0:
+            return m
+    return 1
+
+
+def choose_params(index_type, n, d):
+    """Pick index parameters from corpus size n and dimension d."""
+    if index_type == "ivfpq":
+        # ~4*sqrt(n) lists, but keep >= 39 training points per list as FAISS recommends
+        nlist = int(min(max(4 * math.sqrt(n), 1), max(n // 39, 1), 65536))
+        # ~8 dims per sub-quantizer: 768-d nomic vectors -> 96 bytes per code instead of 3072
+        m = _largest_divisor_at_most(d, max(d // 8, 1))
+        # 8-bit codes need ~39 * 256 training points; small corpora get coarser codebooks
+        nbits = max(1, min(8, int(math.log2(max(n / 39, 2)))))
+        return {"nlist": nlist, "m": m, "nbits": nbits, "nprobe": max(1, nlist // 16)}
+    if index_type == "hnsw":
+        return {"M": 32, "ef_construction": 200 if n < 1_000_000 else 80, "ef_search": 64}
+    if index_type == "pq":
+        # ~4 dims per sub-quantizer: 768-d vectors -> 192-byte codes, 16x smaller than float32
+        m = _largest_divisor_at_most(d, max(d // 4, 1))
+        nbits = max(1, min(8, int(math.log2(max(n / 39, 2)))))
+        return {"m": m, "nbits": nbits}
+    return {}
+
+
+def build_index(vectors, index_type="flat", params=None):
+    """Build and fill a FAISS index of the given type (L2 metric, as FAISS.from_texts uses)."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    params = params or choose_params(index_type, n, d)
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(d)
+    elif index_type == "ivfpq":
+        quantizer = faiss.IndexFlatL2(d)
+        index = faiss.IndexIVFPQ(quantizer, d, params["nlist"], params["m"], params["nbits"])
+        print(f"Training IVF-PQ index (nlist={params['nlist']}, m={params['m']}, nbits={params['nbits']})...")
+        index.train(vectors)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, params["M"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    elif index_type == "sq8":
+        # One byte per dimension, 4x smaller than float32; training only records per-dim ranges
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        index.train(vectors)
+    elif index_type == "pq":
+        index = faiss.IndexPQ(d, params["m"], params["nbits"])
+        print(f"Training PQ index (m={params['m']}, nbits={params['nbits']})...")
+        index.train(vectors)
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+
+    index.add(vectors)
+    apply_search_params(index, {"type": index_type, "params": params})
+    return index, params
+
+
+def apply_search_params(index, config):
+    """Set query-time knobs (nprobe / efSearch) recorded in the index config."""
+    index_type = config.get("type", "flat")
+    params = config.get("params", {})
+    if index_type == "ivfpq" and "nprobe" in params:
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+    elif index_type == "hnsw" and "ef_search" in params:
+        index.hnsw.efSearch = params["ef_search"]
+
+
+def save_index_config(index_path, index_type, params):
+    with open(os.path.join(index_path, INDEX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({"type": index_type, "params": params}, f, indent=2)
+
+
+def load_index_config(index_path):
+    config_path = os.path.join(index_path, INDEX_CONFIG_FILE)
+    if not os.path.exists(config_path):
+        return {"type": "flat", "params": {}}
+    with open(config_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_full_vectors(index_path, vectors):
+    # Replaced atomically: a running retriever may have the previous file memory-mapped
+    path = os.path.join(index_path, FULL_VECTORS_FILE)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+    os.replace(path + ".tmp", path)
+
+
+def write_full_vectors(index_path, blocks, count, dimension):
+    """save_full_vectors for vectors that arrive in blocks, e.g. slices of the memory-mapped file
+    being replaced; only one block is in memory at a time."""
+    path = os.path.join(index_path, FULL_VECTORS_FILE)
+    out = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=np.float32, shape=(count, dimension))
+    row = 0
+    for block in blocks:
+        out[row:row + len(block)] = block
+        row += len(block)
+    if row != count:
+        raise ValueError(f"Wrote {row} full-precision vectors, expected {count}")
+    out.flush()
+    del out
+    os.replace(path + ".tmp", path)
+
+
+def load_full_vectors(index_path):
+    path = os.path.join(index_path, FULL_VECTORS_FILE)
+    return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+
+def rescore(query_vector, rows, full_vectors, k):
+    """Re-rank candidate index rows by exact L2 distance to their full-precision vectors."""
+    rows = np.asarray([row for row in rows if row != -1], dtype=np.int64)
+    if len(rows) == 0:
+        return rows
+    # Ascending row order keeps reads from the memory-mapped file sequential
+    rows = np.sort(rows)
+    candidates = np.asarray(full_vectors[rows], dtype=np.float32)
+    distances = ((candidates - np.asarray(query_vector, dtype=np.float32).reshape(1, -1)) ** 2).sum(axis=1)
+    return rows[np.argsort(distances, kind="stable")[:k]]
+
+
+def wrap_index(index, texts, embeddings, metadatas=None, ids=None):
+    """Wrap a filled FAISS index in a LangChain FAISS vector store (row i <-> texts[i])."""
+    ids = ids or [str(uuid.uuid4()) for _ in texts]
+    metadatas = metadatas or [{} for _ in texts]
+    docstore = InMemoryDocstore(
+        {doc_id: Document(page_content=text, metadata=metadata) for doc_id, text, metadata in zip(ids, texts, metadatas)}
+    )
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
+
+
+def _search_latencies(index, queries, k, full_vectors=None):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        if full_vectors is None:
+            _, found = index.search(query.reshape(1, -1), k)
+            found = found[0]
+        else:
+            _, candidates = index.search(query.reshape(1, -1), k * RESCORE_OVERSAMPLE)
+            found = rescore(query, candidates[0], full_vectors, k)
+        latencies.append(time.perf_counter() - start)
+        results.append(np.pad(found, (0, k - len(found)), constant_values=-1))
+    return np.array(results), np.array(latencies)
+
+
+def recall_report(vectors, index_types=("ivfpq", "hnsw", "sq8", "pq"), num_queries=500, k=10, seed=0):
+    """Compare ANN index settings with exact flat search; return a list of result rows."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    # Perturbed corpus vectors stand in for real queries near the data
+    queries = vectors[sample] + rng.normal(0, 0.01, size=(len(sample), vectors.shape[1])).astype(np.float32)
+
+    flat, _ = build_index(vectors, "flat")
+    truth, flat_latencies = _search_latencies(flat, queries, k)
+    rows = [_row("flat", {}, flat, truth, truth, flat_latencies, k)]
+
+    for index_type in index_types:
+        index, params = build_index(vectors, index_type)
+        if index_type in ("sq8", "pq"):
+            # No search knob; compare raw codes with full-precision re-scoring instead
+            for full_vectors in (None, vectors):
+                found, latencies = _search_latencies(index, queries, k, full_vectors)
+                tuned = {**params, "rescore": full_vectors is not None}
+                rows.append(_row(index_type, tuned, index, found, truth, latencies, k))
+            continue
+        if index_type == "ivfpq":
+            sweep = ("nprobe", [1, 4, 8, 16, 32, 64])
+        else:
+            sweep = ("ef_search", [16, 32, 64, 128, 256])
+        knob, values = sweep
+        for value in values:
+            tuned = {**params, knob: value}
+            apply_search_params(index, {"type": index_type, "params": tuned})
+            found, latencies = _search_latencies(index, queries, k)
+            rows.append(_row(index_type, tuned, index, found, truth, latencies, k))
+        if index_type == "ivfpq":
+            found, latencies = _search_latencies(index, queries, k, vectors)
+            rows.append(_row(index_type, {**tuned, "rescore": True}, index, found, truth, latencies, k))
+    return rows
+
+
+def _row(index_type, params, index, found, truth, latencies, k):
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return {
+        "type": index_type,
+        "params": params,
+        f"recall@{k}": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+        "size_mb": round(len(faiss.serialize_index(index)) / 1e6, 2),
+    }
+
+
+def print_report(rows):
+    recall_key = next(key for key in rows[0] if key.startswith("recall@"))
+    print(f"{'type':<8}{'params':<55}{recall_key:>10}{'p50 ms':>9}{'p99 ms':>9}{'size MB':>9}")
+    for row in rows:
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items())
+        print(f"{row['type']:<8}{params:<55}{row[recall_key]:>10.3f}{row['p50_ms']:>9.3f}"
+              f"{row['p99_ms']:>9.3f}{row['size_mb']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k / latency report for ANN index settings against exact search.")
+    parser.add_argument("--index", default="faiss_index", help="directory of a flat index built by save_index.py")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    flat_index = faiss.read_index(os.path.join(args.index, "index.faiss"))
+    corpus = flat_index.reconstruct_n(0, flat_index.ntotal)
+    print_report(recall_report(corpus, num_queries=args.queries, k=args.k))
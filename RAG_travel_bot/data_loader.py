@@ -1,38 +1,114 @@
 import mwparserfromhell
 import bz2
+import json
+import os
 import xml.etree.ElementTree as ET
-from io import StringIO
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 
-def extract_text_from_wikivoyage(xml_dump_path, output_file="data/wikivoyage_combined.txt"):
-    # Buffer to accumulate plain text
-    full_text = []
-    context = ET.iterparse(StringIO(), events=("start", "end"))  # Initial empty context
+def _local_name(tag):
+    # MediaWiki dumps namespace every tag, e.g. "{http://www.mediawiki.org/xml/export-0.11/}page"
+    return tag.rsplit("}", 1)[-1]
 
-    # Open the bz2 file
-    with bz2.open(xml_dump_path, "rt", encoding="utf-8") as file:
-        # Parse XML incrementally
+
+def iter_wikivoyage_pages(xml_dump_path, namespaces=(0,)):
+    """Stream {id, title, revision, text} records for each <page> in the bz2 dump.
+
+    Only pages in `namespaces` are yielded (0 = articles). Parsed elements are
+    cleared as we go, so memory stays flat regardless of dump size.
+    """
+    with bz2.open(xml_dump_path, "rb") as file:
         context = ET.iterparse(file, events=("start", "end"))
-        current_text = None
+        _, root = next(context)
 
         for event, elem in context:
-            if event == "start" and elem.tag.endswith("text"):  # Start of <text> tag
-                current_text = ""  # Reset buffer for new text section
-            elif event == "end" and elem.tag.endswith("text"):  # End of <text> tag
-                if elem.text:
-                    wiki_code = mwparserfromhell.parse(elem.text)
-                    plain_text = wiki_code.strip_code().strip()  # Remove wiki markup
-                    if plain_text:  # Only add non-empty text
-                        full_text.append(plain_text)
-            # Clear element to free memory
+            if event != "end" or _local_name(elem.tag) != "page":
+                continue
+
+            page = {"id": None, "title": None, "revision": None, "text": None}
+            ns = None
+            for child in elem:
+                name = _local_name(child.tag)
+                if name == "title":
+                    page["title"] = child.text
+                elif name == "ns":
+                    ns = int(child.text)
+                elif name == "id":
+                    page["id"] = int(child.text)
+                elif name == "revision":
+                    for field in child:
+                        field_name = _local_name(field.tag)
+                        if field_name == "id":
+                            page["revision"] = int(field.text)
+                        elif field_name == "text":
+                            page["text"] = field.text
+
+            # Drop the finished page and everything the root still references
             elem.clear()
+            root.clear()
+
+            if page["text"] and (namespaces is None or ns in namespaces):
+                yield page
+
+
+def _strip_pages(pages):
+    # Runs in a worker process
+    stripped = []
+    for page in pages:
+        plain_text = mwparserfromhell.parse(page["text"]).strip_code().strip()  # Remove wiki markup
+        if plain_text:  # Only keep non-empty text
+            stripped.append({**page, "text": plain_text})
+    return stripped
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def extract_text_from_wikivoyage(xml_dump_path, output_file="data/wikivoyage_articles.jsonl",
+                                 max_workers=None, batch_size=64):
+    """Strip wikitext from every article in parallel and append them, in dump order, as JSON lines.
+
+    Each line holds the page id, revision id, title and plain text. At most two
+    batches per worker are in flight, which bounds memory.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    batches = _batched(iter_wikivoyage_pages(xml_dump_path), batch_size)
+    total = 0
+
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as out, ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+
+        def submit_next():
+            batch = next(batches, None)
+            if batch is not None:
+                pending.append(pool.submit(_strip_pages, batch))
+
+        for _ in range(max_workers * 2):
+            submit_next()
+        while pending:
+            articles = pending.popleft().result()
+            submit_next()
+            for article in articles:
+                out.write(json.dumps(article, ensure_ascii=False) + "\n")
+            total += len(articles)
+            if total and total % 10000 < len(articles):
+                print(f"Extracted {total} articles...")
 
-    # Save all extracted text to a file
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("\n\n".join(full_text))  # Separate articles with double newlines
-    print(f"Extracted text saved to {output_file}. Total articles: {len(full_text)}")
+    print(f"Extracted text saved to {output_file}. Total articles: {total}")
+    return total
 
 
-# Path to your Wikivoyage dump
-xml_dump = "data/enwikivoyage-latest-pages-articles.xml.bz2"
-extract_text_from_wikivoyage(xml_dump)
\ No newline at end of file
+if __name__ == "__main__":
+    # Path to your Wikivoyage dump
+    xml_dump = "data/enwikivoyage-latest-pages-articles.xml.bz2"
+    extract_text_from_wikivoyage(xml_dump)
@@ -0,0 +1,123 @@
+# embedding_builder.py
+import hashlib
+import json
+import os
+import random
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = 4
+MAX_RETRIES = 5
+
+
+def _model_identity(embeddings):
+    # Shards from another model (or another server's build of it) must never be mixed in
+    return "|".join(str(part) for part in (
+        type(embeddings).__name__, getattr(embeddings, "model", None), getattr(embeddings, "base_url", None),
+    ))
+
+
+def _texts_fingerprint(texts, batch_size, model_identity=""):
+    digest = hashlib.sha256(f"{model_identity}|{batch_size}".encode("utf-8"))
+    for text in texts:
+        digest.update(hashlib.sha256(text.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+def _embed_with_retry(embeddings, batch, max_retries=MAX_RETRIES):
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings.embed_documents(batch)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            # Exponential backoff with jitter, so parallel workers do not retry in lockstep
+            delay = min(2 ** attempt, 30) * (0.5 + random.random())
+            print(f"Embedding batch failed ({e}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def _shard_path(checkpoint_dir, batch_number):
+    return os.path.join(checkpoint_dir, f"batch_{batch_number:06d}.npy")
+
+
+def _prepare_checkpoint(checkpoint_dir, fingerprint, count, batch_size):
+    meta_path = os.path.join(checkpoint_dir, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            if json.load(f).get("fingerprint") == fingerprint:
+                return
+        # Checkpoint belongs to different input; it cannot be resumed
+        print(f"Discarding stale checkpoint in {checkpoint_dir}.")
+        shutil.rmtree(checkpoint_dir)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "count": count, "batch_size": batch_size}, f)
+
+
+def embed_texts(texts, embeddings, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_WORKERS, checkpoint_dir=None):
+    """Embed texts in batches with several requests in flight; return a float32 (n, d) array.
+
+    With a checkpoint_dir every finished batch is saved as an .npy shard, and a
+    rerun over the same texts only embeds the batches that are still missing.
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if checkpoint_dir:
+        _prepare_checkpoint(checkpoint_dir, _texts_fingerprint(texts, batch_size, _model_identity(embeddings)),
+                            len(texts), batch_size)
+
+    results = {}
+    todo = []
+    for batch_number in range(len(batches)):
+        if checkpoint_dir and os.path.exists(_shard_path(checkpoint_dir, batch_number)):
+            continue
+        todo.append(batch_number)
+    if len(todo) < len(batches):
+        print(f"Resuming: {len(batches) - len(todo)} of {len(batches)} batches already embedded.")
+
+    start_time = time.time()
+    resumed = done = len(batches) - len(todo)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = {}
+        queue = iter(todo)
+
+        def submit_next():
+            batch_number = next(queue, None)
+            if batch_number is not None:
+                in_flight[pool.submit(_embed_with_retry, embeddings, batches[batch_number])] = batch_number
+
+        for _ in range(max_workers * 2):
+            submit_next()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch_number = in_flight.pop(future)
+                vectors = np.asarray(future.result(), dtype=np.float32)
+                if checkpoint_dir:
+                    # Write then rename, so a crash never leaves a truncated shard behind
+                    tmp_path = _shard_path(checkpoint_dir, batch_number) + ".tmp"
+                    with open(tmp_path, "wb") as f:
+                        np.save(f, vectors)
+                    os.replace(tmp_path, _shard_path(checkpoint_dir, batch_number))
+                else:
+                    results[batch_number] = vectors
+                done += 1
+                submit_next()
+            if done % 50 == 0 or not in_flight:
+                rate = ((done - resumed) * batch_size) / max(time.time() - start_time, 1e-9)
+                print(f"Embedded {done}/{len(batches)} batches (~{rate:.0f} chunks/s).")
+
+    if not batches:
+        return np.zeros((0, 0), dtype=np.float32)
+    if checkpoint_dir:
+        return np.concatenate([np.load(_shard_path(checkpoint_dir, n)) for n in range(len(batches))])
+    return np.concatenate([results[n] for n in range(len(batches))])
+
+
+def clear_checkpoint(checkpoint_dir):
+    if checkpoint_dir and os.path.exists(checkpoint_dir):
+        shutil.rmtree(checkpoint_dir)
@@ -0,0 +1,204 @@
+# evaluate.py
+import argparse
+import csv
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import INDEX_TYPES, QUANTIZED_TYPES, RESCORE_OVERSAMPLE, build_index, rescore
+from save_index import group_bitext_records
+from sparse_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+class HashingEmbeddings:
+    """Deterministic, offline stand-in for nomic-embed-text.
+
+    Unigrams and bigrams are hashed into a fixed number of signed buckets and the
+    vector is L2-normalized, so results are identical on every machine and run.
+    Absolute scores are lower than with a real model; use it to compare configurations.
+    """
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        terms = tokenize(text)
+        for feature in terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return np.stack([self._embed(text) for text in texts]) if texts else np.zeros((0, self.dimension), np.float32)
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def load_records(data_path=None):
+    """Bitext rows as dicts: from a local CSV/JSONL export, or the Hugging Face cache."""
+    if data_path is None:
+        from datasets import load_dataset
+
+        # Offline when the dataset is cached (HF_DATASETS_OFFLINE=1)
+        return list(load_dataset("bitext/Bitext-travel-llm-chatbot-training-dataset", split="train"))
+    with open(data_path, encoding="utf-8", newline="") as f:
+        if data_path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def split_holdout(records, fraction=0.05, max_queries=500):
+    """Deterministically hold out questions by hashing their text; return (corpus, queries).
+
+    Held-out records are left out of the corpus, so a query can only be answered
+    by other records of the same intent, as a new user question would be.
+    """
+    corpus, queries = [], []
+    threshold = int(fraction * 10_000)
+    for record_id, item in enumerate(records):
+        digest = hashlib.sha1(item["instruction"].encode("utf-8")).digest()
+        if int.from_bytes(digest[:4], "little") % 10_000 < threshold:
+            queries.append((digest, record_id, item))
+        else:
+            corpus.append((record_id, item))
+    queries.sort(key=lambda query: query[0])
+    return corpus, [(record_id, item) for _, record_id, item in queries[:max_queries]]
+
+
+def _search(index, index_type, query_vector, k, full_vectors):
+    if index_type in QUANTIZED_TYPES:
+        _, candidates = index.search(query_vector.reshape(1, -1), k * RESCORE_OVERSAMPLE)
+        return list(rescore(query_vector, candidates[0], full_vectors, k))
+    _, rows = index.search(query_vector.reshape(1, -1), k)
+    return [row for row in rows[0] if row != -1]
+
+
+def evaluate_config(index_type, mode, vectors, texts, metadatas, queries, query_vectors, ks):
+    """Build one configuration and score it on the held-out queries; returns a result row."""
+    start = time.perf_counter()
+    index, params = build_index(vectors, index_type)
+    sparse = BM25Index().build(range(len(texts)), texts) if mode == "hybrid" else None
+    build_seconds = time.perf_counter() - start
+    # Resident size; the full-precision vectors quantized indexes re-score with stay memory-mapped on disk
+    size_bytes = len(faiss.serialize_index(index)) + (len(pickle.dumps(sparse, pickle.HIGHEST_PROTOCOL)) if sparse else 0)
+
+    max_k = max(ks)
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks, latencies = [], []
+    for (_, item), query_vector in zip(queries, query_vectors):
+        start = time.perf_counter()
+        if mode == "hybrid":
+            dense_rows = _search(index, index_type, query_vector, max_k * 5, vectors)
+            sparse_rows = [row for row, _ in sparse.search(item["instruction"], max_k * 5)]
+            rows = reciprocal_rank_fusion([dense_rows, sparse_rows])[:max_k]
+        else:
+            rows = _search(index, index_type, query_vector, max_k, vectors)
+        latencies.append(time.perf_counter() - start)
+
+        relevant = [metadatas[row]["intent"] == item["intent"] for row in rows]
+        first = next((rank for rank, is_relevant in enumerate(relevant, start=1) if is_relevant), None)
+        reciprocal_ranks.append(1.0 / first if first else 0.0)
+        for k in ks:
+            hits[k] += bool(first and first <= k)
+
+    latencies = np.array(latencies) * 1000
+    row = {"index": index_type, "mode": mode, "params": params}
+    row.update({f"recall@{k}": hits[k] / len(queries) for k in ks})
+    row.update({
+        f"mrr@{max_k}": float(np.mean(reciprocal_ranks)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "build_s": build_seconds,
+        "size_mb": size_bytes / 1e6,
+    })
+    return row
+
+
+def run_evaluation(records, index_types=INDEX_TYPES, modes=("dense", "hybrid"), pairs_per_chunk=(1,), ks=(1, 4, 10),
+                   holdout=0.05, max_queries=500, dimension=384):
+    corpus, queries = split_holdout(records, holdout, max_queries)
+    print(f"{len(corpus)} corpus records, {len(queries)} held-out questions.")
+    embeddings = HashingEmbeddings(dimension)
+    query_vectors = embeddings.embed_documents([item["instruction"] for _, item in queries])
+
+    rows = []
+    for pairs in pairs_per_chunk:
+        texts, metadatas = group_bitext_records(corpus, pairs)
+        start = time.perf_counter()
+        vectors = embeddings.embed_documents(texts)
+        print(f"pairs_per_chunk={pairs}: {len(texts)} chunks embedded in {time.perf_counter() - start:.2f} seconds.")
+        for index_type in index_types:
+            for mode in modes:
+                row = evaluate_config(index_type, mode, vectors, texts, metadatas, queries, query_vectors, ks)
+                row["chunks"] = len(texts)
+                row["pairs_per_chunk"] = pairs
+                rows.append(row)
+                print(format_row(row))
+    return rows
+
+
+def _columns(rows):
+    metrics = [key for key in rows[0] if key.startswith(("recall@", "mrr@"))]
+    return ["pairs_per_chunk", "chunks", "index", "mode"] + metrics + ["p50_ms", "p95_ms", "p99_ms", "build_s", "size_mb"]
+
+
+def format_row(row):
+    return ", ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                     for key, value in row.items() if key != "params")
+
+
+def write_report(rows, output_path):
+    """Write the comparison as a Markdown table, or CSV when output_path ends in .csv."""
+    columns = _columns(rows)
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        if output_path.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=columns + ["params"])
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({**{column: row[column] for column in columns}, "params": json.dumps(row["params"])})
+            return
+        f.write("| " + " | ".join(columns) + " |\n")
+        f.write("|" + "---|" * len(columns) + "\n")
+        for row in rows:
+            cells = [f"{row[column]:.3f}" if isinstance(row[column], float) else str(row[column]) for column in columns]
+            f.write("| " + " | ".join(cells) + " |\n")
+
+
+def _list(cast):
+    return lambda value: [cast(item) for item in value.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline retrieval evaluation: recall@k, MRR, search latency, build time and index size per configuration."
+    )
+    parser.add_argument("--data", help="local Bitext CSV or JSONL export (default: Hugging Face cache)")
+    parser.add_argument("--index-types", type=_list(str), default=list(INDEX_TYPES), help="comma-separated, e.g. flat,hnsw")
+    parser.add_argument("--modes", type=_list(str), default=["dense", "hybrid"], help="dense and/or hybrid (BM25 + vector)")
+    parser.add_argument("--pairs-per-chunk", type=_list(int), default=[1], help="comma-separated chunking settings")
+    parser.add_argument("-k", type=_list(int), default=[1, 4, 10], help="comma-separated cut-offs for recall@k")
+    parser.add_argument("--holdout", type=float, default=0.05, help="fraction of questions held out as queries")
+    parser.add_argument("--max-queries", type=int, default=500)
+    parser.add_argument("--dimension", type=int, default=384, help="hashing embedding dimension")
+    parser.add_argument("--output", default="eval_report.md", help="Markdown table, or CSV if it ends in .csv")
+    args = parser.parse_args()
+
+    unknown = set(args.index_types) - set(INDEX_TYPES)
+    if unknown:
+        parser.error(f"unknown index types: {', '.join(sorted(unknown))}")
+    if set(args.modes) - {"dense", "hybrid"}:
+        parser.error("--modes takes dense and/or hybrid")
+    results = run_evaluation(load_records(args.data), args.index_types, args.modes, args.pairs_per_chunk, args.k,
+                             args.holdout, args.max_queries, args.dimension)
+    write_report(results, args.output)
+    print(f"Wrote {len(results)} configurations to {os.path.abspath(args.output)}.")
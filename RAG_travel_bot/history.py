@@ -0,0 +1,121 @@
+# history.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SYSTEM_PROMPT = (
+    "You are a helpful travel advisor. Use the context and the conversation so far to answer the question. "
+    "If the context lacks sufficient detail, say so and provide a general response. "
+    "Answer in a friendly, informative tone."
+)
+
+
+def estimate_tokens(text):
+    # llama3's tokenizer is not available locally; ~4 characters per token is close enough for budgeting
+    return max(1, len(text) // 4)
+
+
+def _fallback_summary(summary, turns):
+    lines = [summary] if summary else []
+    for user, assistant in turns:
+        lines.append(f"- Traveller asked: {user[:200]} / Advisor said: {assistant[:200]}")
+    return "\n".join(lines)
+
+
+# One summarization thread for the process, shared by every session's history
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+
+
+class ConversationHistory:
+    """Token-budgeted chat history that keeps recent turns verbatim and folds older ones into a summary.
+
+    build_messages() puts the system text and summary first and the retrieved
+    context last, so the start of the prompt stays byte-identical between turns
+    (until the next fold) and Ollama can reuse its cached prefix. Folding runs on
+    a background thread, so add_turn() never waits for the summarizer.
+    """
+
+    def __init__(self, budget_tokens=1024, keep_turns=4, summarize=None):
+        self.budget_tokens = budget_tokens
+        self.keep_turns = keep_turns
+        self.summarize = summarize
+        self.summary = ""
+        self.turns = []  # (user, assistant)
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def _turn_tokens(self):
+        return sum(estimate_tokens(user) + estimate_tokens(assistant) for user, assistant in self.turns)
+
+    def add_turn(self, user, assistant):
+        with self._lock:
+            self.turns.append((user, assistant))
+            if self._pending is not None and not self._pending.done():
+                return
+            if self._turn_tokens() + estimate_tokens(self.summary) <= self.budget_tokens:
+                return
+            summary, old = self.summary, self.turns[:self._fold_count()]
+        if not old:
+            return
+        if self.summarize is None:
+            self._fold(summary, old)
+        else:
+            # Summarizing with llama3 takes seconds; the old turns stay verbatim until it is done
+            self._pending = _summary_executor.submit(self._fold, summary, old)
+
+    def _fold_count(self):
+        # Fold the oldest turns until the verbatim part is back under half the budget (and at most
+        # keep_turns), so several turns pass before the prefix has to change again
+        remaining = self._turn_tokens()
+        cut = 0
+        while cut < len(self.turns) - 1 and (remaining > self.budget_tokens // 2
+                                             or len(self.turns) - cut > self.keep_turns):
+            user, assistant = self.turns[cut]
+            remaining -= estimate_tokens(user) + estimate_tokens(assistant)
+            cut += 1
+        return cut
+
+    def _fold(self, summary, old):
+        try:
+            new_summary = self.summarize(summary, old) if self.summarize else None
+        except Exception as e:
+            print(f"History summarization failed ({e}); using a truncated transcript.")
+            new_summary = None
+        new_summary = new_summary or _fallback_summary(summary, old)
+        # The summary gets a quarter of the budget; drop its oldest part if it grows past that
+        max_chars = self.budget_tokens  # ~budget / 4 tokens
+        if len(new_summary) > max_chars:
+            new_summary = new_summary[-max_chars:]
+        with self._lock:
+            # New turns are only ever appended, so the folded ones are still at the front
+            self.summary = new_summary
+            self.turns = self.turns[len(old):]
+
+    def build_messages(self, context, question):
+        with self._lock:
+            summary, turns = self.summary, list(self.turns)
+        system = SYSTEM_PROMPT
+        if summary:
+            system += f"\n\nSummary of the earlier conversation:\n{summary}"
+        messages = [{"role": "system", "content": system}]
+        for user, assistant in turns:
+            messages.append({"role": "user", "content": user})
+            messages.append({"role": "assistant", "content": assistant})
+        messages.append({"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"})
+        return messages
+
+    def prompt_tokens(self, context, question):
+        return sum(estimate_tokens(message["content"]) for message in self.build_messages(context, question))
+
+
+def ollama_summarizer(client, model="llama3"):
+    """Return a summarize(summary, turns) callable backed by an Ollama client."""
+    def summarize(summary, turns):
+        transcript = "\n".join(f"Traveller: {user}\nAdvisor: {assistant}" for user, assistant in turns)
+        prompt = (
+            "Update the running summary of a travel-advice conversation. Keep destinations, dates, budgets "
+            "and preferences the traveller mentioned. Reply with the summary only.\n\n"
+            f"Current summary:\n{summary or '(none)'}\n\nNew conversation:\n{transcript}"
+        )
+        response = client.chat(model=model, messages=[{"role": "user", "content": prompt}])
+        return response["message"]["content"].strip()
+    return summarize
@@ -0,0 +1,137 @@
+# index_registry.py
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from ann_index import apply_search_params, load_full_vectors, load_index_config
+from sparse_index import load_sparse_index
+
+# Written last by save_index.py; a new value tells running retrievers to swap indexes
+VERSION_FILE = "VERSION"
+
+# Files written by FAISS.save_local
+INDEX_FILES = ("index.faiss", "index.pkl")
+
+# Windows cannot replace a file while it is memory-mapped, so there the index is read into RAM
+USE_MMAP = os.name != "nt"
+
+
+def read_version(index_path):
+    version_path = os.path.join(index_path, VERSION_FILE)
+    if not os.path.exists(version_path):
+        return "unversioned"  # index saved before versions were written
+    with open(version_path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def new_version():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def publish_version(index_path, version=None):
+    """Mark everything currently in index_path as a new version and return its id."""
+    version = version or new_version()
+    version_path = os.path.join(index_path, VERSION_FILE)
+    with open(version_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(version_path + ".tmp", version_path)
+    return version
+
+
+def save_vector_store(vectorstore, index_path):
+    """save_local through a staging directory, then move each file into place.
+
+    FAISS writes in place, which would corrupt the index under a process that
+    has it memory-mapped; os.replace gives the file a new inode instead, and the
+    old one stays valid until that process swaps to the new version.
+    """
+    staging_path = os.path.join(index_path, ".staging")
+    vectorstore.save_local(staging_path)
+    for name in INDEX_FILES:
+        os.replace(os.path.join(staging_path, name), os.path.join(index_path, name))
+    shutil.rmtree(staging_path, ignore_errors=True)
+
+
+class IndexSnapshot:
+    """One published version of the index: vector store, BM25 index, config and, for quantized
+    indexes, memory-mapped full-precision vectors; all read-only."""
+
+    def __init__(self, version, vector_store, sparse_index, config, full_vectors=None):
+        self.version = version
+        self.vector_store = vector_store
+        self.sparse_index = sparse_index
+        self.config = config
+        self.full_vectors = full_vectors
+
+
+def load_snapshot(index_path, embeddings):
+    version = read_version(index_path)
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if USE_MMAP else 0
+    index = faiss.read_index(os.path.join(index_path, "index.faiss"), flags)
+    config = load_index_config(index_path)
+    apply_search_params(index, config)
+    with open(os.path.join(index_path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    vector_store = FAISS(embeddings, index, docstore, index_to_docstore_id)
+    full_vectors = load_full_vectors(index_path)
+    if full_vectors is not None and len(full_vectors) != index.ntotal:
+        print(f"{len(full_vectors)} full-precision vectors for {index.ntotal} index rows; re-scoring disabled.")
+        full_vectors = None
+    return IndexSnapshot(version, vector_store, load_sparse_index(index_path), config, full_vectors)
+
+
+class IndexRegistry:
+    """Process-wide holder of the current index snapshot, shared by every session.
+
+    current() checks the VERSION file at most every poll_seconds. When it
+    changes, one caller loads the new version while the others keep searching
+    the old one, and the reference is then swapped in a single assignment. An old
+    snapshot is freed once no running request holds it.
+    """
+
+    def __init__(self, index_path, embeddings, poll_seconds=5.0):
+        self.index_path = index_path
+        self.embeddings = embeddings
+        self.poll_seconds = poll_seconds
+        self._snapshot = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._next_check:
+            return snapshot
+        # The first load has to wait; later reloads never block searches on the old snapshot
+        if not self._lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self._snapshot is None or time.monotonic() >= self._next_check:
+                self._refresh()
+        finally:
+            self._lock.release()
+        return self._snapshot
+
+    def _refresh(self):
+        self._next_check = time.monotonic() + self.poll_seconds
+        if not os.path.exists(os.path.join(self.index_path, "index.faiss")):
+            return  # index removed for a rebuild; keep serving what is loaded
+        version = read_version(self.index_path)
+        if self._snapshot is not None and version in ("unversioned", self._snapshot.version):
+            # No VERSION file once something is loaded means save_index.py is mid-write;
+            # an index without one is only loaded when there is nothing else to serve
+            return
+        start_time = time.time()
+        try:
+            snapshot = load_snapshot(self.index_path, self.embeddings)
+        except Exception as e:
+            print(f"Could not load index version {version} ({e}); keeping the current one.")
+            return
+        self._snapshot = snapshot
+        print(f"Loaded {snapshot.config['type']} index version {snapshot.version} "
+              f"({snapshot.vector_store.index.ntotal} vectors, mmap={USE_MMAP}) in {time.time() - start_time:.2f} seconds.")
@@ -0,0 +1,92 @@
+# ollama_stream.py
+import asyncio
+import queue
+import threading
+
+import ollama
+
+_DONE = object()
+
+
+class OllamaStreamLoop:
+    """One event loop thread and one ollama.AsyncClient for the whole process.
+
+    Every session streams through the same loop and HTTP connection pool, so
+    the number of threads and clients stays fixed however many sessions come
+    and go.
+    """
+
+    def __init__(self, host=None):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="ollama-stream", daemon=True)
+        self.thread.start()
+        # The async HTTP client must be created on the loop that will use it
+        self.client = self.run(self._make_client(host)).result()
+
+    async def _make_client(self, host):
+        return ollama.AsyncClient(host=host)
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class StreamingChatSession:
+    """Token streaming from Ollama for one Streamlit session.
+
+    Holds only the session's in-flight answer; the loop and client belong to a
+    shared OllamaStreamLoop. Starting a new stream cancels the one still
+    running, e.g. when the user sends another message mid-answer.
+    """
+
+    def __init__(self, stream_loop, model="llama3"):
+        self.stream_loop = stream_loop
+        self.model = model
+        self._current = None
+
+    def cancel(self):
+        if self._current is not None and not self._current.done():
+            self._current.cancel()
+
+    def stream(self, messages, options=None):
+        """Start generating and return a blocking iterator over the answer tokens."""
+        self.cancel()
+        tokens = queue.Queue()
+        client = self.stream_loop.client
+
+        async def produce():
+            try:
+                async for part in await client.chat(
+                    model=self.model, messages=messages, stream=True, options=options
+                ):
+                    tokens.put(part["message"]["content"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                tokens.put(e)
+            finally:
+                tokens.put(_DONE)
+
+        future = self.stream_loop.run(produce())
+        self._current = future
+
+        def iterate():
+            try:
+                while True:
+                    item = tokens.get()
+                    if item is _DONE:
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                # Streamlit stops the script run when a new message arrives; stop generating too
+                if not future.done():
+                    future.cancel()
+
+        return iterate()
+
+    def close(self):
+        self.cancel()
@@ -0,0 +1,90 @@
+# query_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(query):
+    # "Best time to visit Paris?" and "best time to visit  paris" share one entry
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+class LRUCache:
+    """Thread-safe least-recently-used map with a fixed number of entries."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class QueryCache:
+    """Process-wide caches in front of the query embedding call and the index search.
+
+    Embeddings are keyed on the normalized query text (the first spelling seen is
+    the one embedded); retrieval results on
+    (index version, embedding hash, search settings). sync() empties both when a
+    different index version is being served, since a rebuild may also change
+    the embedding model.
+    """
+
+    def __init__(self, embeddings, max_embeddings=4096, max_results=2048):
+        self.embeddings = embeddings
+        self.vectors = LRUCache(max_embeddings)
+        self.results = LRUCache(max_results)
+        self.version = None
+        self._lock = threading.Lock()
+
+    def sync(self, version):
+        with self._lock:
+            if version != self.version:
+                self.vectors.clear()
+                self.results.clear()
+                self.version = version
+
+    def embed(self, query):
+        key = normalize_query(query)
+        vector = self.vectors.get(key)
+        if vector is None:
+            # The normalized text is only the cache key; the model sees the question as typed
+            vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+            vector.flags.writeable = False  # shared between sessions
+            self.vectors.put(key, vector)
+        return vector
+
+    def retrieve(self, query_vector, settings, search):
+        """Return cached documents for this vector and settings, or run search() and cache its result."""
+        key = (self.version, hashlib.sha1(query_vector.tobytes()).hexdigest(), settings)
+        docs = self.results.get(key)
+        if docs is None:
+            docs = search()
+            self.results.put(key, tuple(docs))
+        return list(docs)
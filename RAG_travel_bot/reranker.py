@@ -0,0 +1,63 @@
+# reranker.py
+from history import estimate_tokens
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:  # reranking is optional
+    CrossEncoder = None
+
+DEFAULT_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def reranker_available():
+    return CrossEncoder is not None
+
+
+class Reranker:
+    """Small CPU cross-encoder that scores (query, chunk) pairs in batches."""
+
+    def __init__(self, model_name=DEFAULT_MODEL, batch_size=16, max_length=512):
+        if CrossEncoder is None:
+            raise ImportError("Reranking needs sentence-transformers: pip install sentence-transformers")
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        self.batch_size = batch_size
+
+    def score(self, query, docs):
+        pairs = [(query, doc.page_content) for doc in docs]
+        return [float(score) for score in self.model.predict(pairs, batch_size=self.batch_size)]
+
+
+def _shingles(text, size=3):
+    words = text.lower().split()
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def deduplicate(docs, threshold=0.85):
+    """Drop chunks whose word 3-gram Jaccard similarity to an earlier chunk reaches threshold."""
+    kept, kept_shingles = [], []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & other) / max(len(shingles | other), 1) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def select_context(query, docs, reranker, top_k=4, context_tokens=1200):
+    """Rerank candidates, drop near-duplicates and keep the best ones that fit the context budget."""
+    if not docs:
+        return []
+    scores = reranker.score(query, docs)
+    ranked = [doc for _, doc in sorted(zip(scores, docs), key=lambda pair: pair[0], reverse=True)]
+
+    selected, used = [], 0
+    for doc in deduplicate(ranked):
+        tokens = estimate_tokens(doc.page_content)
+        if selected and used + tokens > context_tokens:
+            continue
+        selected.append(doc)
+        used += tokens
+        if len(selected) == top_k or used >= context_tokens:
+            break
+    return selected
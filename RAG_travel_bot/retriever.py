@@ -1,57 +1,215 @@
 # main.py
 import ollama
 from langchain_ollama import OllamaEmbeddings
-from langchain_community.vectorstores import FAISS
 import streamlit as st
+import numpy as np
 import os
 
+from ann_index import RESCORE_OVERSAMPLE, rescore
+from history import ConversationHistory, ollama_summarizer
+from index_registry import IndexRegistry
+from ollama_stream import OllamaStreamLoop, StreamingChatSession
+from query_cache import QueryCache
+from reranker import Reranker, reranker_available, select_context
+from sparse_index import reciprocal_rank_fusion
+from vector_backends import get_backend
+
+# Ollama server (OLLAMA_BASE_URL can point at another server, e.g. a local stub)
+ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
 # Load Ollama embeddings
-embeddings = OllamaEmbeddings(model="nomic-embed-text")
+embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url=ollama_base_url)
 
 # Define FAISS index path
 faiss_index_path = "faiss_index"
 
+# "faiss" (default) or "chroma"; must match save_index.py --backend
+vector_backend = os.getenv("VECTOR_BACKEND", "faiss")
+
+
+@st.cache_resource
+def get_index_registry():
+    # One memory-mapped index per process, shared read-only by every session and
+    # swapped in place when save_index.py publishes a new version
+    return IndexRegistry(faiss_index_path, embeddings)
+
+
+@st.cache_resource
+def get_query_cache():
+    # Shared by all sessions: stock questions are embedded and searched once per index version
+    return QueryCache(embeddings)
+
+
+@st.cache_resource
+def get_chroma_backend():
+    # Shared by every session; refresh() on each run picks up a collection published by save_index.py
+    return get_backend("chroma", embeddings)
+
 
 def initialize_vector_store():
-    if os.path.exists(faiss_index_path):
-        vectorstore = FAISS.load_local(faiss_index_path, embeddings, allow_dangerous_deserialization=True)
-        st.write("FAISS index loaded successfully.")
-        return vectorstore
-    else:
+    snapshot = get_index_registry().current()
+    if snapshot is None:
         st.error("FAISS index not found. Please run save_index.py first.")
-        return None
+    return snapshot
 
 
-def get_rag_response(query, vector_store, conversation_history=""):
-    if vector_store is None:
-        return "Sorry, the travel knowledge base isn’t ready yet."
+def embed_query(query, query_cache=None):
+    if query_cache is not None:
+        return query_cache.embed(query)
+    return np.array(embeddings.embed_query(query), dtype=np.float32)
+
 
-    # Retrieve more context chunks for broader coverage
-    docs = vector_store.similarity_search(query, k=4)  # Increased from 2 to 4
+def dense_search_ids(query_vector, vector_store, k, full_vectors=None):
+    # Plain FAISS search returning docstore ids, so results can be fused with BM25 by id
+    query_vector = query_vector.reshape(1, -1)
+    if full_vectors is None:
+        _, rows = vector_store.index.search(query_vector, k)
+        rows = rows[0]
+    else:
+        # Quantized index: over-fetch on the compressed codes, then rank exactly on the mapped vectors
+        _, candidates = vector_store.index.search(query_vector, k * RESCORE_OVERSAMPLE)
+        rows = rescore(query_vector[0], candidates[0], full_vectors, k)
+    return [vector_store.index_to_docstore_id[row] for row in rows if row != -1]
+
+
+def retrieve_documents(query, vector_store, k=4, category=None, sparse_index=None, full_vectors=None,
+                       query_cache=None):
+    query_vector = embed_query(query, query_cache)
+    if query_cache is None:
+        return _search_documents(query, query_vector, vector_store, k, category, sparse_index, full_vectors)
+    # Identical questions on the same index version skip the embedding call and the search
+    settings = (k, category, sparse_index is not None, full_vectors is not None)
+    return query_cache.retrieve(query_vector, settings, lambda: _search_documents(
+        query, query_vector, vector_store, k, category, sparse_index, full_vectors))
+
+
+def _search_documents(query, query_vector, vector_store, k, category, sparse_index, full_vectors):
+    search_filter = {"category": category} if category else None
+    fetch_k = k * (20 if category else 5)
+    if sparse_index is None:
+        if full_vectors is None:
+            return vector_store.similarity_search_by_vector(query_vector.tolist(), k=k, filter=search_filter)
+        ranked_ids = dense_search_ids(query_vector, vector_store, fetch_k if category else k, full_vectors)
+    else:
+        # Hybrid: over-fetch from both indexes, fuse by reciprocal rank, then apply the filter
+        dense_ids = dense_search_ids(query_vector, vector_store, fetch_k, full_vectors)
+        sparse_ids = [doc_id for doc_id, _ in sparse_index.search(query, fetch_k)]
+        ranked_ids = reciprocal_rank_fusion([dense_ids, sparse_ids])
+    docs = []
+    for doc_id in ranked_ids:
+        doc = vector_store.docstore.search(doc_id)
+        if isinstance(doc, str):  # id no longer in the docstore (stale BM25 file)
+            continue
+        if category and doc.metadata.get("category") != category:
+            continue
+        docs.append(doc)
+        if len(docs) == k:
+            break
+    return docs
+
+
+def get_rag_response(query, vector_store, conversation_history="", category=None, sparse_index=None,
+                     chat_session=None, history=None, reranker=None, full_vectors=None, query_cache=None):
+    """Answer a travel question; with a chat_session, return an iterator of answer tokens instead.
+
+    With a ConversationHistory the prompt is built as chat messages with a stable
+    prefix; otherwise conversation_history is inlined as plain text. With a
+    reranker, candidates are over-fetched and only the best ones within the
+    context budget are kept. full_vectors re-scores a quantized index's results,
+    and a query_cache reuses embeddings and results of earlier identical questions.
+    """
+    if vector_store is None:
+        message = "Sorry, the travel knowledge base isn’t ready yet."
+        return iter([message]) if chat_session else message
+
+    # Retrieve more context chunks for broader coverage, optionally within one Bitext category
+    if reranker is not None:
+        candidates = retrieve_documents(query, vector_store, k=16, category=category, sparse_index=sparse_index,
+                                        full_vectors=full_vectors, query_cache=query_cache)
+        docs = select_context(query, candidates, reranker, top_k=4)
+    else:
+        docs = retrieve_documents(query, vector_store, k=4, category=category, sparse_index=sparse_index,
+                                  full_vectors=full_vectors, query_cache=query_cache)  # Increased from 2 to 4
     context = "\n".join([doc.page_content for doc in docs])
 
-    # Include conversation history in the prompt to maintain context
-    prompt = f"""You are a helpful travel advisor. Use the following context and conversation history to answer the question. If the context lacks sufficient detail, say so and provide a general response.
+    if history is not None:
+        messages = history.build_messages(context, query)
+    else:
+        # Include conversation history in the prompt to maintain context
+        prompt = f"""You are a helpful travel advisor. Use the following context and conversation history to answer the question. If the context lacks sufficient detail, say so and provide a general response.
     Conversation History: {conversation_history}
     Context: {context}
     Question: {query}
     Answer in a friendly, informative tone."""
+        messages = [{"role": "user", "content": prompt}]
+    if chat_session is not None:
+        return chat_session.stream(messages)
 
-    response = ollama.chat(model="llama3", messages=[{"role": "user", "content": prompt}])
+    response = ollama.Client(host=ollama_base_url).chat(model="llama3", messages=messages)
     return response['message']['content']
 
 
+@st.cache_resource
+def get_stream_loop():
+    # One event loop thread and AsyncClient per process; sessions only keep their in-flight answer
+    return OllamaStreamLoop(host=ollama_base_url)
+
+
+@st.cache_resource
+def load_reranker():
+    # One cross-encoder per process, shared by every session
+    return Reranker()
+
+
 def main():
     st.title("Travel Advisor Chatbot")
     st.write("Ask me anything about travel destinations!")
 
-    if 'vector_store' not in st.session_state:
+    if vector_backend == "chroma":
+        # Dense search only: BM25 ids and re-scoring vectors belong to the FAISS index files
+        vector_store = get_chroma_backend()
+        if not vector_store.refresh():
+            st.error("Chroma collection is empty. Please run save_index.py --backend chroma first.")
+            vector_store = None
+        loaded_sparse_index = full_vectors = None
+        index_version = f"chroma:{vector_store.version}" if vector_store else None
+    else:
+        # Looked up on every run rather than kept in session_state, so sessions never pin an old index
         with st.spinner("Loading travel knowledge base..."):
-            st.session_state.vector_store = initialize_vector_store()
+            snapshot = initialize_vector_store()
+        vector_store = snapshot.vector_store if snapshot else None
+        loaded_sparse_index = snapshot.sparse_index if snapshot else None
+        full_vectors = snapshot.full_vectors if snapshot else None
+        index_version = snapshot.version if snapshot else None
+        if snapshot:
+            st.sidebar.caption(f"Index {snapshot.version} ({snapshot.config['type']})")
+
+    retrieval_mode = st.sidebar.radio(
+        "Retrieval", ["Hybrid (BM25 + vector)", "Vector only"],
+        disabled=loaded_sparse_index is None,
+    )
+    sparse_index = loaded_sparse_index if retrieval_mode.startswith("Hybrid") else None
+    use_reranker = st.sidebar.checkbox(
+        "Rerank with cross-encoder", value=False, disabled=not reranker_available(),
+        help="Needs sentence-transformers. Over-fetches chunks and keeps only the most relevant ones.",
+    )
+    reranker = load_reranker() if use_reranker else None
+    query_cache = get_query_cache()
+    query_cache.sync(index_version)
 
     if 'messages' not in st.session_state:
         st.session_state.messages = []
 
+    # Per-session cancel state over the shared streaming loop
+    if 'chat_session' not in st.session_state:
+        st.session_state.chat_session = StreamingChatSession(get_stream_loop(), model="llama3")
+
+    # Recent turns verbatim, older ones summarized, within a fixed token budget
+    if 'history' not in st.session_state:
+        st.session_state.history = ConversationHistory(
+            summarize=ollama_summarizer(ollama.Client(host=ollama_base_url))
+        )
+
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
@@ -63,13 +221,14 @@ def main():
 
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
-                # Build conversation history from previous messages
-                conversation_history = "\n".join(
-                    [f"{m['role']}: {m['content']}" for m in st.session_state.messages[:-1]]
-                )
-                response = get_rag_response(prompt, st.session_state.vector_store, conversation_history)
-                st.markdown(response)
+                tokens = get_rag_response(prompt, vector_store, sparse_index=sparse_index,
+                                          chat_session=st.session_state.chat_session,
+                                          history=st.session_state.history, reranker=reranker,
+                                          full_vectors=full_vectors, query_cache=query_cache)
+            # Render tokens as they arrive; a new message cancels this stream
+            response = st.write_stream(tokens)
             st.session_state.messages.append({"role": "assistant", "content": response})
+            st.session_state.history.add_turn(prompt, response)
 
 
 if __name__ == "__main__":
@@ -3,20 +3,44 @@ from datasets import load_dataset
 from langchain_ollama import OllamaEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+import argparse
+import hashlib
+import json
 import os
 import time
 
+import numpy as np
+
+from ann_index import (INDEX_TYPES, QUANTIZED_TYPES, UPDATABLE_TYPES, load_full_vectors, load_index_config,
+                       write_full_vectors)
+from embedding_builder import DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, clear_checkpoint, embed_texts
+from index_registry import publish_version, save_vector_store
+from vector_backends import BACKENDS, get_backend
+from sparse_index import build_sparse_index
+
 # Silence warnings
 import logging
 
 logging.getLogger("langchain.text_splitter").setLevel(logging.ERROR)
 
-# Load Ollama embeddings
-embeddings = OllamaEmbeddings(model="nomic-embed-text")
+# Load Ollama embeddings (OLLAMA_BASE_URL can point at another server, e.g. a local stub)
+embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"))
 
 # Define FAISS index path
 faiss_index_path = "faiss_index"
 
+# Per-page record of what is in the index: {page_id: {"revision", "hash", "ids"}}
+MANIFEST_FILE = "manifest.json"
+
+# Pages buffered before deletes/adds are applied to the index
+UPDATE_BATCH_PAGES = 256
+
+# Embedded batches are checkpointed here so an interrupted build can resume
+checkpoint_path = "faiss_index_checkpoint"
+
+# Same for Wikivoyage updates, one subdirectory per flush
+wikivoyage_checkpoint_path = "wikivoyage_checkpoint"
+
 
 # Load Bitext Travel dataset from Hugging Face
 def load_bitext_travel_data():
@@ -27,32 +51,265 @@ def load_bitext_travel_data():
     return text_data
 
 
-TRAVEL_DATA = load_bitext_travel_data()
+def load_bitext_travel_records(pairs_per_chunk=1):
+    """Return (texts, metadatas) with each Q/A pair, or a small group of same-intent pairs, as one chunk.
+
+    Chunks never cut across Q/A boundaries and carry intent/category metadata,
+    so retrieval can filter on them.
+    """
+    print("Loading Bitext Travel dataset from Hugging Face...")
+    dataset = load_dataset("bitext/Bitext-travel-llm-chatbot-training-dataset", split="train")
+    return group_bitext_records(enumerate(dataset), pairs_per_chunk)
+
+
+def group_bitext_records(records, pairs_per_chunk=1):
+    """Chunk (record_id, item) pairs the way load_bitext_travel_records does; returns (texts, metadatas)."""
+    # Group pairs per (category, intent), keeping dataset order inside each group
+    groups = {}
+    for record_id, item in records:
+        key = (item.get("category") or "", item.get("intent") or "")
+        groups.setdefault(key, []).append((record_id, item))
 
+    texts, metadatas = [], []
+    for (category, intent), items in groups.items():
+        for start in range(0, len(items), pairs_per_chunk):
+            group = items[start:start + pairs_per_chunk]
+            texts.append("\n".join(f"Q: {item['instruction']} A: {item['response']}" for _, item in group))
+            metadatas.append({
+                "source": "bitext",
+                "category": category,
+                "intent": intent,
+                "record_ids": [record_id for record_id, _ in group],
+            })
+    return texts, metadatas
 
-# Build and save FAISS index
-def create_faiss_index():
+
+def get_text_splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+
+# Build and save FAISS index (or fill a Chroma collection with the same chunks)
+def create_faiss_index(batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_WORKERS, chunking="records", pairs_per_chunk=1,
+                       index_type="flat", backend="faiss"):
     start_time = time.time()
 
-    print("Splitting text...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    texts = text_splitter.split_text(TRAVEL_DATA)
+    if chunking == "records":
+        print("Chunking Bitext records...")
+        texts, metadatas = load_bitext_travel_records(pairs_per_chunk)
+    else:
+        # Legacy mode: one big string cut by character count, kept for comparisons
+        print("Splitting text...")
+        texts = get_text_splitter().split_text(load_bitext_travel_data())
+        metadatas = None
     print(f"Created {len(texts)} chunks.")
 
-    print("Generating embeddings and building FAISS index...")
-    vectorstore = FAISS.from_texts(texts, embeddings)
+    print("Generating embeddings...")
+    vectors = embed_texts(texts, embeddings, batch_size=batch_size, max_workers=max_workers,
+                          checkpoint_dir=checkpoint_path)
 
-    print("Saving FAISS index...")
-    vectorstore.save_local(faiss_index_path)
+    if backend == "faiss":
+        # Quantized index types also keep full-precision vectors for the retriever to re-score with
+        print(f"Building and saving {index_type} FAISS index...")
+        store = get_backend("faiss", embeddings, path=faiss_index_path, index_type=index_type)
+    else:
+        print(f"Saving {backend} vector store...")
+        store = get_backend(backend, embeddings)
+    version = store.build(texts, vectors, metadatas)
+    clear_checkpoint(checkpoint_path)
 
     end_time = time.time()
-    print(f"FAISS index saved to {faiss_index_path}. Took {end_time - start_time:.2f} seconds.")
+    print(f"{backend} store {version} saved to {store.path}. Took {end_time - start_time:.2f} seconds.")
+
+
+def load_manifest(index_path=faiss_index_path):
+    manifest_path = os.path.join(index_path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {"pages": {}}
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, index_path=faiss_index_path):
+    manifest_path = os.path.join(index_path, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def iter_wikivoyage_articles(articles_path):
+    # JSON lines written by data_loader.py: {"id", "title", "revision", "text"}
+    with open(articles_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def update_wikivoyage_index(articles_path, index_path=faiss_index_path,
+                            batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_WORKERS,
+                            checkpoint_dir=wikivoyage_checkpoint_path):
+    """Bring the index in line with a Wikivoyage extract, touching only pages that changed.
+
+    New or edited pages (by revision id and content hash) are re-chunked and
+    re-embedded, pages missing from the extract are deleted by vector id, and
+    every other vector is kept as is. The embeddings of each flush are
+    checkpointed: until the update is saved, a rerun over the same extract visits
+    pages in the same order and only embeds the batches that are still missing.
+    """
+    start_time = time.time()
+    index_type = load_index_config(index_path)["type"]
+    if index_type not in UPDATABLE_TYPES:
+        # Edited/deleted pages cannot be applied in place: HNSW cannot drop vectors, and IVF keeps the
+        # old ids after a removal while LangChain renumbers its row -> docstore id map as 0..n-1
+        raise ValueError(f"Incremental updates need a {', '.join(UPDATABLE_TYPES)} index, not {index_type}; "
+                         "rebuild with --rebuild instead.")
+    vectorstore = None
+    if os.path.exists(os.path.join(index_path, "index.faiss")):
+        vectorstore = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+    # Full-precision vectors of a quantized index are kept in step with its rows: the file stays
+    # memory-mapped while deleted rows and new vectors are collected, and is rewritten once at the end
+    full_vectors = None
+    if vectorstore is not None and index_type in QUANTIZED_TYPES:
+        full_vectors = load_full_vectors(index_path)
+    if full_vectors is not None:
+        original_rows = {doc_id: row for row, doc_id in vectorstore.index_to_docstore_id.items()}
+        deleted_rows = []
+        added_vectors = []
+    manifest = load_manifest(index_path)
+    old_pages = manifest["pages"]
+    new_pages = {}
+    text_splitter = get_text_splitter()
+    stats = {"unchanged": 0, "changed": 0, "new": 0, "deleted": 0, "chunks_embedded": 0}
+
+    pending_deletes, pending_texts, pending_metadatas, pending_ids = [], [], [], []
+    flushes = 0
+
+    def flush():
+        nonlocal vectorstore, flushes
+        # Deletes go first: an edited page reuses its vector ids
+        if pending_deletes and vectorstore is not None:
+            if full_vectors is not None:
+                # Only ids from the manifest are ever deleted, so they all map to rows of the original file
+                deleted_rows.extend(original_rows[doc_id] for doc_id in pending_deletes)
+            vectorstore.delete(pending_deletes)
+        if pending_texts:
+            flushes += 1
+            flush_checkpoint = os.path.join(checkpoint_dir, f"flush_{flushes:06d}") if checkpoint_dir else None
+            vectors = embed_texts(pending_texts, embeddings, batch_size=batch_size, max_workers=max_workers,
+                                  checkpoint_dir=flush_checkpoint)
+            text_embeddings = list(zip(pending_texts, vectors.tolist()))
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=pending_metadatas, ids=pending_ids)
+            else:
+                vectorstore.add_embeddings(text_embeddings, metadatas=pending_metadatas, ids=pending_ids)
+            if full_vectors is not None:
+                added_vectors.append(vectors)
+            stats["chunks_embedded"] += len(pending_texts)
+        for pending in (pending_deletes, pending_texts, pending_metadatas, pending_ids):
+            pending.clear()
+
+    pages_in_batch = 0
+    for article in iter_wikivoyage_articles(articles_path):
+        page_id = str(article["id"])
+        content_hash = hashlib.sha256(article["text"].encode("utf-8")).hexdigest()
+        previous = old_pages.get(page_id)
+
+        if previous and previous["revision"] == article["revision"] and previous["hash"] == content_hash:
+            new_pages[page_id] = previous
+            stats["unchanged"] += 1
+            continue
+
+        if previous:
+            pending_deletes.extend(previous["ids"])
+            stats["changed"] += 1
+        else:
+            stats["new"] += 1
+
+        chunks = text_splitter.split_text(article["text"])
+        ids = [f"wikivoyage:{page_id}:{i}" for i in range(len(chunks))]
+        pending_texts.extend(chunks)
+        pending_ids.extend(ids)
+        pending_metadatas.extend(
+            {"source": "wikivoyage", "page_id": article["id"], "title": article["title"], "revision": article["revision"]}
+            for _ in chunks
+        )
+        new_pages[page_id] = {"revision": article["revision"], "hash": content_hash, "ids": ids}
+
+        pages_in_batch += 1
+        if pages_in_batch >= UPDATE_BATCH_PAGES:
+            flush()
+            pages_in_batch = 0
+
+    for page_id, previous in old_pages.items():
+        if page_id not in new_pages:
+            pending_deletes.extend(previous["ids"])
+            stats["deleted"] += 1
+    flush()
+
+    if vectorstore is None:
+        print("No articles to index.")
+        clear_checkpoint(checkpoint_dir)
+        return stats
+
+    print("Saving FAISS index...")
+    save_vector_store(vectorstore, index_path)
+    if full_vectors is not None:
+        # FAISS.delete compacts the remaining rows in order and adds append, so the new file is the kept
+        # original rows followed by the added vectors
+        keep = np.ones(len(full_vectors), dtype=bool)
+        keep[deleted_rows] = False
+
+        def blocks(rows_per_block=65536):
+            for start in range(0, len(full_vectors), rows_per_block):
+                yield full_vectors[start:start + rows_per_block][keep[start:start + rows_per_block]]
+            yield from added_vectors
+
+        write_full_vectors(index_path, blocks(), vectorstore.index.ntotal, full_vectors.shape[1])
+    # BM25 is CPU-only and cheap next to embedding, so it is simply rebuilt
+    build_sparse_index(vectorstore, index_path)
+    manifest["pages"] = new_pages
+    save_manifest(manifest, index_path)
+    # Running retrievers pick the update up from here
+    publish_version(index_path)
+    clear_checkpoint(checkpoint_dir)
+
+    print(
+        f"Wikivoyage update: {stats['new']} new, {stats['changed']} changed, {stats['deleted']} deleted, "
+        f"{stats['unchanged']} unchanged pages; embedded {stats['chunks_embedded']} chunks "
+        f"in {time.time() - start_time:.2f} seconds."
+    )
+    return stats
 
 
 if __name__ == "__main__":
-    # Delete old index if exists
-    if os.path.exists(faiss_index_path):
+    parser = argparse.ArgumentParser(description="Build or update the travel FAISS index.")
+    parser.add_argument("--wikivoyage", metavar="JSONL",
+                        help="incrementally update the index from data_loader.py output")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="delete the existing index first (implied when building the Bitext index)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="chunks per embedding request")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="embedding requests in flight")
+    parser.add_argument("--chunking", choices=["records", "splitter"], default="records",
+                        help="Bitext chunking: one chunk per Q/A record group, or the old character splitter")
+    parser.add_argument("--pairs-per-chunk", type=int, default=1, help="same-intent Q/A pairs per record chunk")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat",
+                        help="exact flat search, IVF-PQ / HNSW approximate search with size-based parameters, "
+                             "or int8 (sq8) / product-quantized (pq) codes re-scored with full-precision vectors")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="faiss",
+                        help="vector store for the Bitext build; the chatbot reads VECTOR_BACKEND to match")
+    args = parser.parse_args()
+    if args.wikivoyage and args.backend != "faiss":
+        parser.error("incremental Wikivoyage updates are only implemented for the FAISS backend")
+
+    # Delete old index if exists (the Chroma backend replaces its own collection)
+    if args.backend == "faiss" and (args.rebuild or not args.wikivoyage) and os.path.exists(faiss_index_path):
         import shutil
 
         shutil.rmtree(faiss_index_path)
-    create_faiss_index()
\ No newline at end of file
+
+    if args.wikivoyage:
+        update_wikivoyage_index(args.wikivoyage, batch_size=args.batch_size, max_workers=args.workers)
+    else:
+        create_faiss_index(batch_size=args.batch_size, max_workers=args.workers,
+                           chunking=args.chunking, pairs_per_chunk=args.pairs_per_chunk,
+                           index_type=args.index_type, backend=args.backend)
@@ -0,0 +1,102 @@
+# sparse_index.py
+import heapq
+import math
+import os
+import pickle
+import re
+from array import array
+from collections import Counter
+
+# Saved next to index.faiss by save_index.py
+SPARSE_INDEX_FILE = "bm25.pkl"
+
+# Keep letters/digits together so codes like "JFK" or "A320" survive as single terms
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from how i in is it me my of on or the to what when where which who why "
+    "will with you your".split()
+)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index whose rows map to FAISS docstore ids."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self.doc_lengths = array("I")
+        self.postings = {}  # term -> (array of doc rows, array of term frequencies)
+        self.avg_length = 0.0
+
+    def build(self, doc_ids, texts):
+        postings = {}
+        for row, text in enumerate(texts):
+            terms = Counter(tokenize(text))
+            self.doc_lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                rows, freqs = postings.setdefault(term, (array("I"), array("H")))
+                rows.append(row)
+                freqs.append(min(freq, 65535))
+        self.doc_ids = list(doc_ids)
+        self.postings = postings
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        return self
+
+    def _idf(self, doc_freq):
+        n = len(self.doc_ids)
+        return math.log(1 + (n - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def search(self, query, k=10):
+        """Return [(docstore_id, score)] for the k best-scoring documents."""
+        scores = {}
+        k1, b, avg_length = self.k1, self.b, self.avg_length or 1.0
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            rows, freqs = entry
+            idf = self._idf(len(rows))
+            for row, freq in zip(rows, freqs):
+                norm = k1 * (1 - b + b * self.doc_lengths[row] / avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * freq * (k1 + 1) / (freq + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[row], score) for row, score in best]
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def build_sparse_index(vectorstore, index_path):
+    """Build the BM25 index over every document in a LangChain FAISS store and save it alongside."""
+    doc_ids = list(vectorstore.index_to_docstore_id.values())
+    texts = (vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids)
+    sparse = BM25Index().build(doc_ids, texts)
+    sparse.save(os.path.join(index_path, SPARSE_INDEX_FILE))
+    print(f"BM25 index built over {len(doc_ids)} chunks ({len(sparse.postings)} terms).")
+    return sparse
+
+
+def load_sparse_index(index_path):
+    path = os.path.join(index_path, SPARSE_INDEX_FILE)
+    return BM25Index.load(path) if os.path.exists(path) else None
+
+
+def reciprocal_rank_fusion(ranked_lists, k=60):
+    """Merge ranked id lists: score(id) = sum of 1 / (k + rank) over the lists containing it."""
+    scores = {}
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return [doc_id for doc_id, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
@@ -0,0 +1,312 @@
+# vector_backends.py
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+
+from ann_index import INDEX_TYPES, QUANTIZED_TYPES, build_index, save_full_vectors, save_index_config, wrap_index
+from index_registry import load_snapshot, new_version, publish_version, read_version, save_vector_store
+from sparse_index import build_sparse_index
+
+try:
+    import chromadb
+except ImportError:  # only needed for the Chroma backend
+    chromadb = None
+
+# Where each backend keeps its data by default
+BACKEND_PATHS = {"faiss": "faiss_index", "chroma": "chroma_db"}
+
+# LangChain's default collection name, which the bundled chroma_db uses
+CHROMA_COLLECTION = "langchain"
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+class VectorBackend:
+    """Build/load/search API shared by the vector stores the travel bot can use.
+
+    build() takes precomputed vectors, so the embedding work is done once by
+    embedding_builder and any backend can be filled from it. It runs ingest(),
+    which stores the vectors and texts, then publish(), which adds whatever else
+    the retriever reads and marks the data as a new version. similarity_search()
+    follows the LangChain signature, so a backend can be passed wherever the
+    retriever expects a vector store.
+
+    The retriever reads FAISS indexes through IndexRegistry (hot swaps, hybrid
+    search, re-scoring), so FaissBackend is only used to build them and by the
+    benchmark; the Chroma path of the retriever goes through ChromaBackend.
+    """
+
+    name = None
+
+    def __init__(self, path, embeddings):
+        self.path = path
+        self.embeddings = embeddings
+
+    def build(self, texts, vectors, metadatas=None, ids=None):
+        """Ingest and publish; returns the new version."""
+        self.ingest(texts, vectors, metadatas, ids)
+        return self.publish()
+
+    def ingest(self, texts, vectors, metadatas=None, ids=None):
+        raise NotImplementedError
+
+    def publish(self):
+        raise NotImplementedError
+
+    def load(self):
+        """Open the stored data; returns False if there is nothing to load."""
+        raise NotImplementedError
+
+    def similarity_search_by_vector(self, vector, k=4, filter=None):
+        raise NotImplementedError
+
+    def similarity_search(self, query, k=4, filter=None):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k=k, filter=filter)
+
+    def count(self):
+        raise NotImplementedError
+
+    def disk_bytes(self):
+        return directory_size(self.path)
+
+
+class FaissBackend(VectorBackend):
+    """FAISS index files as written by save_index.py (index, docstore, config, BM25, VERSION)."""
+
+    name = "faiss"
+
+    def __init__(self, path, embeddings, index_type="flat"):
+        super().__init__(path, embeddings)
+        self.index_type = index_type
+        self.vector_store = None
+
+    def ingest(self, texts, vectors, metadatas=None, ids=None):
+        index, params = build_index(vectors, self.index_type)
+        self.vector_store = wrap_index(index, texts, self.embeddings, metadatas=metadatas, ids=ids)
+        os.makedirs(self.path, exist_ok=True)
+        save_vector_store(self.vector_store, self.path)
+        save_index_config(self.path, self.index_type, params)
+        if self.index_type in QUANTIZED_TYPES:
+            save_full_vectors(self.path, vectors)
+
+    def publish(self):
+        # BM25 for hybrid search, which the other backends do not have
+        build_sparse_index(self.vector_store, self.path)
+        return publish_version(self.path)
+
+    def load(self):
+        if not os.path.exists(os.path.join(self.path, "index.faiss")):
+            return False
+        self.vector_store = load_snapshot(self.path, self.embeddings).vector_store
+        return True
+
+    def similarity_search_by_vector(self, vector, k=4, filter=None):
+        return self.vector_store.similarity_search_by_vector(list(map(float, vector)), k=k, filter=filter)
+
+    def count(self):
+        return self.vector_store.index.ntotal
+
+
+def _chroma_metadata(metadata):
+    # Chroma only stores scalar values; lists such as record_ids become comma-separated strings
+    return {key: ",".join(map(str, value)) if isinstance(value, (list, tuple)) else value
+            for key, value in metadata.items()}
+
+
+def _chroma_where(filter):
+    if not filter:
+        return None
+    if len(filter) == 1:
+        return dict(filter)
+    return {"$and": [{key: value} for key, value in filter.items()]}
+
+
+class ChromaBackend(VectorBackend):
+    """Persistent Chroma collection (HNSW, L2 distance, like the FAISS indexes).
+
+    Each build fills a new collection named after its version and then writes the
+    VERSION file, as save_index.py does for FAISS, so a running retriever keeps
+    searching the old collection until refresh() sees the new version. The
+    previous collection is kept for retrievers still switching over; older ones
+    are deleted.
+    """
+
+    name = "chroma"
+
+    def __init__(self, path, embeddings, collection_name=CHROMA_COLLECTION, batch_size=5000):
+        if chromadb is None:
+            raise ImportError("The Chroma backend needs chromadb: pip install chromadb")
+        super().__init__(path, embeddings)
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = None
+        self.version = None
+        self._staged = None
+
+    def _versioned_name(self, version):
+        # The bundled chroma_db predates versions and uses the plain collection name
+        return self.collection_name if version == "unversioned" else f"{self.collection_name}-{version}"
+
+    def ingest(self, texts, vectors, metadatas=None, ids=None):
+        version = new_version()
+        collection = self.client.create_collection(self._versioned_name(version), metadata={"hnsw:space": "l2"})
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        # Chroma rejects empty metadata dicts, so chunks without metadata are added without any
+        if metadatas is not None and not any(metadatas):
+            metadatas = None
+        batch_size = min(self.batch_size, self.client.get_max_batch_size())
+        for start in range(0, len(texts), batch_size):
+            end = start + batch_size
+            collection.add(
+                ids=ids[start:end],
+                embeddings=np.asarray(vectors[start:end], dtype=np.float32).tolist(),
+                documents=list(texts[start:end]),
+                metadatas=[_chroma_metadata(metadata) for metadata in metadatas[start:end]] if metadatas else None,
+            )
+        self._staged = (version, collection)
+
+    def publish(self):
+        version, collection = self._staged
+        previous = self._versioned_name(read_version(self.path)) if os.path.exists(self.path) else None
+        os.makedirs(self.path, exist_ok=True)
+        publish_version(self.path, version)
+        keep = {collection.name, previous}
+        for existing in self.client.list_collections():
+            name = getattr(existing, "name", existing)  # names only since chromadb 0.6
+            if name not in keep and (name == self.collection_name or name.startswith(f"{self.collection_name}-")):
+                self.client.delete_collection(name)
+        self.collection, self.version, self._staged = collection, version, None
+        return version
+
+    def load(self):
+        version = read_version(self.path)
+        try:
+            collection = self.client.get_collection(self._versioned_name(version))
+        except Exception:
+            return False
+        if collection.count() == 0:
+            return False
+        self.collection, self.version = collection, version
+        return True
+
+    def refresh(self):
+        """Switch to a newly published collection; returns False while there is none to search."""
+        if self.collection is not None and read_version(self.path) == self.version:
+            return True
+        # A version that cannot be opened (yet) leaves the current collection in use
+        return self.load() or self.collection is not None
+
+    def similarity_search_by_vector(self, vector, k=4, filter=None):
+        result = self.collection.query(
+            query_embeddings=[np.asarray(vector, dtype=np.float32).tolist()],
+            n_results=k,
+            where=_chroma_where(filter),
+            include=["documents", "metadatas"],
+        )
+        return [Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(result["documents"][0], result["metadatas"][0])]
+
+    def count(self):
+        return self.collection.count()
+
+
+BACKENDS = {"faiss": FaissBackend, "chroma": ChromaBackend}
+
+
+def get_backend(name, embeddings, path=None, **options):
+    return BACKENDS[name](path or BACKEND_PATHS[name], embeddings, **options)
+
+
+def benchmark_backend(backend, texts, vectors, metadatas, query_vectors, k=4, filter=None):
+    """Ingest precomputed vectors into an empty backend and time it; returns a result row.
+
+    ingest_per_s covers storing vectors and texts only; publish_s is the rest of
+    a build (for FAISS the BM25 index, which Chroma has no counterpart for).
+    """
+    start = time.perf_counter()
+    backend.ingest(texts, vectors, metadatas)
+    ingest_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    backend.publish()
+    publish_seconds = time.perf_counter() - start
+
+    row = {"backend": backend.name, "chunks": len(texts), "ingest_per_s": len(texts) / ingest_seconds,
+           "publish_s": publish_seconds}
+    for label, search_filter in (("", None), ("filtered_", filter)):
+        if label and not search_filter:
+            continue
+        latencies = []
+        for vector in query_vectors:
+            start = time.perf_counter()
+            backend.similarity_search_by_vector(vector, k=k, filter=search_filter)
+            latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies) * 1000
+        row[f"{label}p50_ms"] = float(np.percentile(latencies, 50))
+        row[f"{label}p99_ms"] = float(np.percentile(latencies, 99))
+    row["disk_mb"] = backend.disk_bytes() / 1e6
+    return row
+
+
+def print_benchmark(rows):
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    print("".join(f"{column:>16}" for column in columns))
+    for row in rows:
+        print("".join(f"{row[column]:>16.2f}" if isinstance(row.get(column), float) else f"{str(row.get(column, '')):>16}"
+                      for column in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare vector store backends: ingest throughput, query latency and on-disk size on the Bitext corpus."
+    )
+    parser.add_argument("--backends", default="faiss,chroma", help="comma-separated: faiss, chroma")
+    parser.add_argument("--faiss-index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--data", help="local Bitext CSV or JSONL export (default: Hugging Face dataset)")
+    parser.add_argument("--pairs-per-chunk", type=int, default=1)
+    parser.add_argument("--offline", action="store_true",
+                        help="embed with evaluate.py's deterministic hashing model instead of Ollama")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=4)
+    args = parser.parse_args()
+
+    from embedding_builder import embed_texts
+    from evaluate import HashingEmbeddings, load_records, split_holdout
+    from save_index import embeddings as ollama_embeddings, group_bitext_records
+
+    corpus, queries = split_holdout(load_records(args.data), max_queries=args.queries)
+    texts, metadatas = group_bitext_records(corpus, args.pairs_per_chunk)
+    bench_embeddings = HashingEmbeddings() if args.offline else ollama_embeddings
+    print(f"Embedding {len(texts)} chunks and {len(queries)} queries...")
+    if args.offline:
+        corpus_vectors = bench_embeddings.embed_documents(texts)
+    else:
+        corpus_vectors = embed_texts(texts, bench_embeddings)
+    question_vectors = [bench_embeddings.embed_query(item["instruction"]) for _, item in queries]
+    # The most common category, so the filtered search has to skip part of the corpus
+    categories = [metadata["category"] for metadata in metadatas]
+    category_filter = {"category": max(set(categories), key=categories.count)} if categories else None
+
+    results = []
+    for name in args.backends.split(","):
+        # Fresh directories, so the benchmark never touches faiss_index/ or chroma_db/
+        workdir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+        try:
+            options = {"index_type": args.faiss_index_type} if name == "faiss" else {}
+            backend = get_backend(name, bench_embeddings, path=workdir, **options)
+            results.append(benchmark_backend(backend, texts, corpus_vectors, metadatas, question_vectors,
+                                             k=args.k, filter=category_filter))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print_benchmark(results)
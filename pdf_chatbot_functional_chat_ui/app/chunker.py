@@ -1,4 +1,3 @@
-import streamlit as st
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 def chunk_text(text: str, chunk_size=500, chunk_overlap=50):
@@ -6,3 +5,10 @@ def chunk_text(text: str, chunk_size=500, chunk_overlap=50):
     chunks = splitter.split_text(text)
 
     return chunks
+
+def iter_chunks(pages, chunk_size=500, chunk_overlap=50):
+    """Yield (chunk, metadata) for each cleaned (page_number, text) pair, keeping the page number."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for page_number, text in pages:
+        for chunk in splitter.split_text(text):
+            yield chunk, {"page": page_number}
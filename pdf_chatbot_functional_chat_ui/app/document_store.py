@@ -0,0 +1,138 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import faiss
+from langchain.vectorstores import FAISS
+
+from app.embedding_cache import embedding_model_name
+
+DEFAULT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", os.path.join("cache", "indexes"))
+MAX_LOADED_INDEXES = int(os.getenv("DOCUMENT_STORE_MAX_LOADED", 16))
+
+
+def fingerprint_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def corpus_fingerprint(fingerprints) -> str:
+    # Order-independent id for a set of documents, used to scope cached answers
+    return hashlib.sha256("\n".join(sorted(fingerprints)).encode("utf-8")).hexdigest()
+
+
+def _read_index(index_file):
+    # Memory-map the vectors so sessions share the page cache instead of private copies;
+    # older FAISS builds cannot mmap every index type, so fall back to a normal read
+    try:
+        return faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(index_file)
+
+
+def _model_dir(embedding_model) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", embedding_model_name(embedding_model))
+
+
+class DocumentStore:
+    """On-disk FAISS indexes keyed by embedding model and the fingerprint of the uploaded PDF bytes.
+
+    Vectors from one model are never searched with query embeddings from another:
+    after a model change every document is simply rebuilt under the new model.
+
+    Every Streamlit session asking for the same document gets the same in-memory
+    object: indexes any session still searches are found through weak references,
+    and the max_loaded most recently used ones stay loaded after that.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, max_loaded=MAX_LOADED_INDEXES):
+        self.root = root
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._in_use = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, fingerprint, embedding_model):
+        return os.path.join(self.root, _model_dir(embedding_model), fingerprint)
+
+    def has(self, fingerprint, embedding_model) -> bool:
+        return os.path.exists(os.path.join(self._path(fingerprint, embedding_model), "meta.json"))
+
+    def metadata(self, fingerprint, embedding_model):
+        with open(os.path.join(self._path(fingerprint, embedding_model), "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, fingerprint, vector_store, embedding_model, file_name=""):
+        """Persist a built index under its fingerprint and embedding model and return its metadata."""
+        target = self._path(fingerprint, embedding_model)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        staging = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+        vector_store.save_local(staging)
+
+        meta = {
+            "fingerprint": fingerprint,
+            "file_name": file_name,
+            "num_chunks": vector_store.index.ntotal,
+            "dimension": vector_store.index.d,
+            "embedding_model": embedding_model_name(embedding_model),
+            "created_at": time.time(),
+        }
+        # meta.json is written last: its presence marks a complete index
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        if os.path.exists(target):
+            # Another session finished the same document first; keep its copy
+            shutil.rmtree(staging, ignore_errors=True)
+        else:
+            os.replace(staging, target)
+        print(f"💾 [Document Store] Saved index for {file_name or fingerprint[:12]} ({meta['num_chunks']} chunks).")
+        return meta
+
+    def load(self, fingerprint, embedding_model):
+        """Return the shared vector store for a fingerprint, loading it on first use."""
+        key = (_model_dir(embedding_model), fingerprint)
+        with self._lock:
+            vector_store = self._loaded.get(key)
+            if vector_store is None:
+                vector_store = self._in_use.get(key)
+            if vector_store is not None:
+                self._keep(key, vector_store)
+                return vector_store
+
+            start = time.time()
+            path = self._path(fingerprint, embedding_model)
+            index = _read_index(os.path.join(path, "index.faiss"))
+            with open(os.path.join(path, "index.pkl"), "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+            vector_store = FAISS(embedding_model, index, docstore, index_to_docstore_id)
+            self._keep(key, vector_store)
+            self._in_use[key] = vector_store
+            print(f"✅ [Document Store] Loaded index {fingerprint[:12]} in {(time.time() - start) * 1000:.1f} ms.")
+            return vector_store
+
+    def _keep(self, key, vector_store):
+        self._loaded[key] = vector_store
+        self._loaded.move_to_end(key)
+        while len(self._loaded) > self.max_loaded:
+            self._loaded.popitem(last=False)
+
+    def get_or_build(self, fingerprint, build_fn, embedding_model, file_name=""):
+        """Load the index for a fingerprint, calling build_fn() to create it on a miss."""
+        if not self.has(fingerprint, embedding_model):
+            print(f"📌 [Document Store] No stored index for {file_name or fingerprint[:12]}, building...")
+            self.save(fingerprint, build_fn(), embedding_model, file_name=file_name)
+        return self.load(fingerprint, embedding_model)
+
+
+@functools.lru_cache(maxsize=None)
+def get_document_store() -> DocumentStore:
+    return DocumentStore()
@@ -1,10 +1,11 @@
-from langchain.embeddings import OpenAIEmbeddings
+from langchain.embeddings.openai import OpenAIEmbeddings
 import os
 
-def get_embeddings():
-    return OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-
-from langchain.embeddings.openai import OpenAIEmbeddings
+from app.embedding_cache import CachedEmbeddings, get_embedding_cache
 
-def get_embeddings():
-    return OpenAIEmbeddings()
+def get_embeddings(use_cache=True):
+    embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
+    if not use_cache:
+        return embeddings
+    # Re-uploaded documents (and Streamlit reruns) hit the on-disk cache instead of the API
+    return CachedEmbeddings(embeddings, get_embedding_cache())
@@ -0,0 +1,156 @@
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from langchain.embeddings.base import Embeddings
+
+DEFAULT_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("cache", "embeddings.sqlite3"))
+DEFAULT_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+def embedding_model_name(embedding_model) -> str:
+    # OpenAIEmbeddings exposes `model`; fall back to the class name for anything else
+    return getattr(embedding_model, "model", None) or type(embedding_model).__name__
+
+
+def chunk_key(text: str, model_name: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of chunk embeddings with size-based LRU eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Streamlit serves sessions from several threads, so one guarded connection is shared
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys already cached and bump their access time."""
+        found = {}
+        if not keys:
+            return found
+        with self._lock:
+            # SQLite caps the number of bound parameters, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+            )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items, model_name):
+        """Store (key, vector) pairs, then evict least recently used rows over the size budget."""
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            blob = array("f", vector).tobytes()
+            rows.append((key, model_name, blob, len(blob), now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        overflow = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access ASC"):
+            stale.append((key,))
+            freed += size
+            if freed >= overflow:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", stale)
+        print(f"🧹 [Embedding Cache] Evicted {len(stale)} entries ({freed} bytes).")
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends chunks missing from the cache to the wrapped model."""
+
+    def __init__(self, embedding_model, cache: EmbeddingCache):
+        self.embedding_model = embedding_model
+        self.cache = cache
+        self.model_name = embedding_model_name(embedding_model)
+
+    def embed_documents(self, texts):
+        keys = [chunk_key(text, self.model_name) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Embed each missing chunk once, even if it occurs several times in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            print(f"📌 [Embedding Cache] {len(cached)} cached, embedding {len(missing)} new chunks...")
+            vectors = self.embedding_model.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(fresh.items(), self.model_name)
+            cached.update(fresh)
+        else:
+            print(f"✅ [Embedding Cache] All {len(texts)} chunks served from cache.")
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text):
+        # Queries are rarely repeated verbatim, so they go straight to the model
+        return self.embedding_model.embed_query(text)
+
+
+@functools.lru_cache(maxsize=None)
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache()
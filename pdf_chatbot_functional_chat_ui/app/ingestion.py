@@ -0,0 +1,139 @@
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile
+
+import fitz  # PyMuPDF
+
+from app.chunker import iter_chunks
+from app.document_store import fingerprint_bytes, get_document_store
+from app.pdf_extractor import iter_pdf_pages
+from app.text_preprocessor import iter_preprocessed_pages
+from app.vector_store import create_vector_store_from_chunks
+
+STAGES = ("extract", "chunk", "embed", "index")
+MAX_INGEST_WORKERS = int(os.getenv("MAX_INGEST_WORKERS", 2))
+
+
+class IngestionJob:
+    """Status of one PDF going through extract -> chunk -> embed -> index.
+
+    `progress` holds a 0..1 fraction per stage; extraction, chunking and embedding
+    overlap because pages are streamed through the pipeline.
+    """
+
+    def __init__(self, fingerprint, file_name):
+        self.fingerprint = fingerprint
+        self.file_name = file_name
+        self.status = "queued"  # queued | running | done | failed
+        self.stage = None
+        self.progress = {stage: 0.0 for stage in STAGES}
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+
+def build_document_index(pdf_bytes, fingerprint, file_name, embeddings, job=None):
+    """Run the streaming ingestion pipeline for one PDF and return its FAISS index."""
+    with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(pdf_bytes)
+        pdf_path = tmp_file.name
+
+    try:
+        with fitz.open(pdf_path) as doc:
+            page_count = max(doc.page_count, 1)
+        pages_done = 0
+        chunks_done = 0
+
+        def counted_pages():
+            nonlocal pages_done
+            for page in iter_pdf_pages(pdf_path):
+                pages_done += 1
+                if job:
+                    job.stage = "extract"
+                    job.progress["extract"] = pages_done / page_count
+                yield page
+
+        def tagged_chunks():
+            nonlocal chunks_done
+            for chunk, metadata in iter_chunks(iter_preprocessed_pages(counted_pages())):
+                chunks_done += 1
+                if job:
+                    # Chunking keeps pace with extraction, one page at a time
+                    job.progress["chunk"] = pages_done / page_count
+                yield chunk, {**metadata, "doc_id": fingerprint, "source": file_name}
+
+        def on_batch(embedded):
+            if job:
+                job.stage = "embed"
+                job.progress["embed"] = embedded / max(chunks_done, 1) * job.progress["extract"]
+
+        vector_store = create_vector_store_from_chunks(tagged_chunks(), embeddings, progress_callback=on_batch)
+        if job:
+            job.progress.update(extract=1.0, chunk=1.0, embed=1.0)
+        return vector_store
+    finally:
+        os.remove(pdf_path)
+
+
+class IngestionQueue:
+    """Background ingestion workers with a job table deduplicated by PDF fingerprint.
+
+    Sessions submit uploads and poll `get(fingerprint)`; finished indexes land in
+    the document store, where any session can load them.
+    """
+
+    def __init__(self, document_store=None, max_workers=MAX_INGEST_WORKERS):
+        self.document_store = document_store or get_document_store()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-ingest")
+
+    def submit(self, pdf_bytes, file_name, embeddings):
+        fingerprint = fingerprint_bytes(pdf_bytes)
+        with self._lock:
+            job = self._jobs.get(fingerprint)
+            # Reruns and other sessions uploading the same file share one job
+            if job is not None and job.status != "failed":
+                return job
+            job = IngestionJob(fingerprint, file_name)
+            self._jobs[fingerprint] = job
+            if self.document_store.has(fingerprint, embeddings):
+                job.status = "done"
+                job.progress = {stage: 1.0 for stage in STAGES}
+                job.finished_at = time.time()
+                return job
+        self._executor.submit(self._run, job, pdf_bytes, embeddings)
+        return job
+
+    def get(self, fingerprint):
+        with self._lock:
+            return self._jobs.get(fingerprint)
+
+    def _run(self, job, pdf_bytes, embeddings):
+        job.status = "running"
+        print(f"📌 [Ingestion] Started {job.file_name}")
+        try:
+            vector_store = build_document_index(pdf_bytes, job.fingerprint, job.file_name, embeddings, job)
+            job.stage = "index"
+            self.document_store.save(job.fingerprint, vector_store, embeddings, file_name=job.file_name)
+            job.progress["index"] = 1.0
+            job.status = "done"
+            print(f"✅ [Ingestion] Finished {job.file_name} in {time.time() - job.submitted_at:.1f} s")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"❌ [Ingestion] Failed {job.file_name}: {e}")
+        finally:
+            job.finished_at = time.time()
+
+
+@functools.lru_cache(maxsize=None)
+def get_ingestion_queue() -> IngestionQueue:
+    return IngestionQueue()
@@ -0,0 +1,113 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tiktoken
+from langchain.chat_models import ChatOpenAI
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a student and an AI tutor.
+Keep names, definitions and facts the student may refer back to. Return only the new summary.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{lines}
+
+New summary:"""
+
+_encoding = tiktoken.get_encoding("cl100k_base")
+
+# One summarization thread for the process, shared by every session's memory
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding.encode(text))
+
+
+class SummarizingMemory:
+    """Token-budgeted chat memory: recent turns verbatim, older turns folded into a summary.
+
+    Drop-in for ConversationBufferMemory(return_messages=True) as used by ChatRuntime
+    (load_memory_variables / save_context). Summarization runs on a background
+    thread, so a turn never waits for it; until a fold finishes the old turns are
+    simply still sent verbatim.
+
+    Pass the session runtime's `http_client` so summaries reuse its connection
+    pool, or any LangChain chat model as `llm`.
+    """
+
+    memory_key = "chat_history"
+
+    def __init__(self, llm=None, max_turns=4, max_tokens=1500, http_client=None):
+        self.llm = llm or ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo", http_client=http_client)
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summary = ""
+        self.turns = []  # (question, answer, tokens)
+        self.full_history_tokens = 0
+        self.last_tokens_saved = 0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    @property
+    def memory_variables(self):
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs):
+        with self._lock:
+            messages = []
+            sent_tokens = 0
+            if self.summary:
+                messages.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+                sent_tokens += count_tokens(self.summary)
+            for question, answer, tokens in self.turns:
+                messages.extend([HumanMessage(content=question), AIMessage(content=answer)])
+                sent_tokens += tokens
+            # Compared with replaying every turn verbatim, as ConversationBufferMemory does
+            self.last_tokens_saved = max(self.full_history_tokens - sent_tokens, 0)
+        return {self.memory_key: messages}
+
+    def save_context(self, inputs, outputs):
+        question = next(iter(inputs.values()))
+        answer = next(iter(outputs.values()))
+        tokens = count_tokens(question) + count_tokens(answer)
+        with self._lock:
+            self.turns.append((question, answer, tokens))
+            self.full_history_tokens += tokens
+            self._maybe_fold()
+
+    def _maybe_fold(self):
+        if self._pending is not None and not self._pending.done():
+            return
+        total = sum(tokens for _, _, tokens in self.turns)
+        overflow = 0
+        # Fold the oldest turns until the verbatim window fits both budgets (always keep the latest)
+        while overflow < len(self.turns) - 1 and (
+            len(self.turns) - overflow > self.max_turns or total > self.max_tokens
+        ):
+            total -= self.turns[overflow][2]
+            overflow += 1
+        if overflow:
+            self._pending = _summary_executor.submit(self._fold, self.summary, self.turns[:overflow])
+
+    def _fold(self, summary, turns):
+        lines = "\n".join(f"Student: {q}\nTutor: {a}" for q, a, _ in turns)
+        try:
+            new_summary = self.llm.predict(SUMMARY_PROMPT.format(summary=summary or "(none)", lines=lines)).strip()
+        except Exception as e:
+            print(f"⚠️ [Memory] Summarization failed, keeping turns verbatim: {e}")
+            return
+        with self._lock:
+            # New turns are only ever appended, so the folded ones are still at the front
+            self.summary = new_summary
+            self.turns = self.turns[len(turns):]
+        print(f"🧠 [Memory] Folded {len(turns)} turns into the running summary.")
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self.turns = []
+            self.full_history_tokens = 0
+            self.last_tokens_saved = 0
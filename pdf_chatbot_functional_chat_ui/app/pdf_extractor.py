@@ -1,9 +1,90 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import fitz  # PyMuPDF
 
+PAGES_PER_TASK = 8
+MAX_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", min(os.cpu_count() or 1, 8)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
 def extract_text_from_pdf(pdf_path: str) -> str:
-    doc = fitz.open(pdf_path)
-    full_text = ""
-    for page in doc:
-        full_text += page.get_text()
-    return full_text
+    # Join once at the end instead of growing one string page by page
+    return "".join(text for _, text in iter_pdf_pages(pdf_path, max_workers=1))
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int):
+    # Runs in a worker process: each worker opens its own handle on the file
+    with fitz.open(pdf_path) as doc:
+        return [(number + 1, doc[number].get_text()) for number in range(start, stop)]
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Process-wide extraction pool, created on first use and shared by every ingestion thread.
+
+    Workers are started with forkserver (spawn where that is unavailable): forking
+    the multithreaded Streamlit server directly can deadlock the child.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=MAX_EXTRACT_WORKERS, mp_context=context)
+        return _pool
+
+
+def _discard_pool(pool):
+    # A crashed worker breaks the whole pool; the next PDF starts a fresh one
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_pages(pdf_path: str, max_workers=None, pages_per_task=PAGES_PER_TASK):
+    """Yield (page_number, text) in page order, extracting page ranges in the shared process pool.
+
+    At most two ranges per worker (max_workers, default MAX_EXTRACT_WORKERS) are in
+    flight for this PDF, so memory is bounded by that window of pages rather than
+    by the size of the document.
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    max_workers = max_workers or MAX_EXTRACT_WORKERS
+    if max_workers == 1 or page_count <= pages_per_task:
+        for start in range(0, page_count, pages_per_task):
+            yield from _extract_page_range(pdf_path, start, min(start + pages_per_task, page_count))
+        return
+
+    ranges = iter(range(0, page_count, pages_per_task))
+    pool = get_extraction_pool()
+    pending = deque()
+
+    def submit_next():
+        start = next(ranges, None)
+        if start is not None:
+            pending.append(pool.submit(_extract_page_range, pdf_path, start, min(start + pages_per_task, page_count)))
 
+    try:
+        for _ in range(max_workers * 2):
+            submit_next()
+        while pending:
+            pages = pending.popleft().result()
+            submit_next()
+            yield from pages
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        # Stopped early (failed or abandoned ingestion): drop this PDF's queued ranges
+        for future in pending:
+            future.cancel()
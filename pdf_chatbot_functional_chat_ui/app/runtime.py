@@ -0,0 +1,183 @@
+import time
+
+import httpx
+from langchain.chains import ConversationalRetrievalChain
+from langchain.chat_models import ChatOpenAI
+from langchain.schema import format_document, get_buffer_string
+
+NO_CONTEXT_ANSWER = "⚠️ No relevant content found in the document to answer your question."
+
+
+def _make_http_client():
+    # One keep-alive pool per session instead of a fresh TLS handshake per question
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+        timeout=httpx.Timeout(60.0, connect=10.0),
+    )
+
+
+class ChatRuntime:
+    """Per-session chat state: pooled LLM clients and a chain built once per vector store.
+
+    Each RAG turn condenses the question (only when there is history), retrieves
+    once, and hands those documents straight to the answer chain. Stage timings
+    for the last turn are kept in `last_timings` (seconds).
+
+    `llm` and `plain_llm` can be any LangChain chat model, e.g. a fake streaming
+    model in local tests. With an `answer_cache`, the standalone question is
+    embedded once and used both for the cache lookup and for the vector search.
+    """
+
+    def __init__(self, llm=None, plain_llm=None, k=4, answer_cache=None):
+        self.http_client = _make_http_client()
+        self.llm = llm or ChatOpenAI(temperature=0, model_name="gpt-4-turbo", http_client=self.http_client)
+        self.plain_llm = plain_llm or ChatOpenAI(temperature=0.7, http_client=self.http_client)
+        self.k = k
+        self.vector_store = None
+        self.retriever = None
+        self.chain = None
+        self.answer_cache = answer_cache
+        self.fingerprint = None
+        self.embeddings = None
+        self.last_timings = {}
+        self.last_sources = []
+
+    def set_vector_store(self, vector_store, fingerprint=None, embeddings=None):
+        # The fingerprint scopes cached answers to the document(s) behind the index
+        self.fingerprint = fingerprint
+        self.embeddings = embeddings
+        if vector_store is self.vector_store:
+            return
+        self.vector_store = vector_store
+        if vector_store is None:
+            self.retriever = self.chain = None
+            return
+        self.retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": self.k})
+        self.chain = ConversationalRetrievalChain.from_llm(llm=self.llm, retriever=self.retriever)
+
+    def _report(self, timings):
+        self.last_timings = timings
+        summary = ", ".join(f"{stage}={seconds * 1000:.0f} ms" for stage, seconds in timings.items())
+        print(f"⏱️ [Turn Latency] {summary}")
+
+    def _retrieve(self, query, memory, timings, bypass_cache=False):
+        """Return (question, docs, question_vector, cached) for one turn."""
+        history = memory.load_memory_variables({}).get("chat_history", [])
+
+        # Rewrite follow-ups into a standalone question, as the chain would internally
+        start = time.perf_counter()
+        question = query
+        if history:
+            question = self.chain.question_generator.run(
+                question=query, chat_history=get_buffer_string(history)
+            )
+        timings["condense"] = time.perf_counter() - start
+
+        question_vector = None
+        use_cache = self.answer_cache is not None and self.fingerprint and self.embeddings is not None
+        if use_cache and not bypass_cache:
+            start = time.perf_counter()
+            question_vector = self.embeddings.embed_query(question)
+            cached = self.answer_cache.lookup(self.fingerprint, question_vector)
+            timings["cache_lookup"] = time.perf_counter() - start
+            if cached is not None:
+                return question, [], question_vector, cached
+
+        start = time.perf_counter()
+        if question_vector is not None:
+            docs = self.vector_store.similarity_search_by_vector(question_vector, k=self.k)
+        else:
+            docs = self.retriever.get_relevant_documents(question)
+        timings["retrieve"] = time.perf_counter() - start
+        print("📌 [Retrieved Docs Count]:", len(docs))
+
+        for i, doc in enumerate(docs[:2]):
+            print(f"--- Document {i+1} Content (first 500 characters) ---")
+            print(doc.page_content[:500])
+            print("-" * 50)
+        return question, docs, question_vector, None
+
+    def _use_cached(self, query, memory, cached, timings):
+        answer, sources, _ = cached
+        self.last_sources = sources
+        memory.save_context({"question": query}, {"answer": answer})
+        self._report(timings)
+        return answer
+
+    def _store(self, question, question_vector, answer, docs):
+        self.last_sources = [{"content": doc.page_content[:500], "metadata": doc.metadata} for doc in docs]
+        if question_vector is not None:
+            self.answer_cache.put(self.fingerprint, question_vector, question, answer, self.last_sources)
+
+    def _stream_tokens(self, llm, llm_input, timings):
+        start = time.perf_counter()
+        for chunk in llm.stream(llm_input):
+            if "first_token" not in timings:
+                timings["first_token"] = time.perf_counter() - start
+            token = getattr(chunk, "content", chunk)
+            if token:
+                yield token
+        timings["generate"] = time.perf_counter() - start
+
+    def answer(self, query, memory, bypass_cache=False):
+        timings = {}
+        question, docs, question_vector, cached = self._retrieve(query, memory, timings, bypass_cache)
+        if cached is not None:
+            return self._use_cached(query, memory, cached, timings)
+
+        if not docs:
+            self._report(timings)
+            return NO_CONTEXT_ANSWER
+
+        start = time.perf_counter()
+        result = self.chain.combine_docs_chain.run(input_documents=docs, question=question)
+        timings["generate"] = time.perf_counter() - start
+
+        self._store(question, question_vector, result, docs)
+        memory.save_context({"question": query}, {"answer": result})
+        self._report(timings)
+        return result
+
+    def stream_answer(self, query, memory, bypass_cache=False):
+        """Yield answer tokens as the LLM produces them; memory is updated once the answer completes."""
+        timings = {}
+        question, docs, question_vector, cached = self._retrieve(query, memory, timings, bypass_cache)
+        if cached is not None:
+            yield self._use_cached(query, memory, cached, timings)
+            return
+
+        if not docs:
+            self._report(timings)
+            yield NO_CONTEXT_ANSWER
+            return
+
+        # Build the same "stuff" prompt the combine-documents chain would send
+        combine = self.chain.combine_docs_chain
+        context = combine.document_separator.join(format_document(doc, combine.document_prompt) for doc in docs)
+        messages = combine.llm_chain.prompt.format_prompt(
+            **{combine.document_variable_name: context, "question": question}
+        ).to_messages()
+
+        tokens = []
+        for token in self._stream_tokens(self.llm, messages, timings):
+            tokens.append(token)
+            yield token
+
+        answer = "".join(tokens)
+        self._store(question, question_vector, answer, docs)
+        memory.save_context({"question": query}, {"answer": answer})
+        self._report(timings)
+
+    def stream_plain(self, query):
+        timings = {}
+        yield from self._stream_tokens(self.plain_llm, query, timings)
+        self._report(timings)
+
+    def predict_plain(self, query):
+        start = time.perf_counter()
+        result = self.plain_llm.predict(query)
+        self._report({"generate": time.perf_counter() - start})
+        return result
+
+    def close(self):
+        self.http_client.close()
@@ -0,0 +1,96 @@
+import functools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+DEFAULT_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", 24 * 60 * 60))
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 2000))
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "vector", "question", "answer", "sources", "created_at")
+
+    def __init__(self, fingerprint, vector, question, answer, sources):
+        self.fingerprint = fingerprint
+        self.vector = vector
+        self.question = question
+        self.answer = answer
+        self.sources = sources
+        self.created_at = time.time()
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """In-memory answer cache keyed on (document fingerprint, question embedding).
+
+    A lookup returns the stored answer of the most similar cached question for the
+    same document if its cosine similarity reaches `threshold`. Entries expire after
+    `ttl_seconds` and the least recently used ones are dropped past `max_entries`.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, entry, now):
+        return now - entry.created_at > self.ttl_seconds
+
+    def lookup(self, fingerprint, vector):
+        """Return (answer, sources, similarity) for a close enough cached question, or None."""
+        query = _normalize(vector)
+        now = time.time()
+        with self._lock:
+            best_id, best_score = None, -1.0
+            for entry_id, entry in list(self._entries.items()):
+                if self._expired(entry, now):
+                    del self._entries[entry_id]
+                    continue
+                if entry.fingerprint != fingerprint:
+                    continue
+                score = float(np.dot(entry.vector, query))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            entry = self._entries[best_id]
+            print(f"✅ [Answer Cache] Hit (similarity {best_score:.3f}) for: {entry.question}")
+            return entry.answer, entry.sources, best_score
+
+    def put(self, fingerprint, vector, question, answer, sources):
+        with self._lock:
+            self._entries[uuid.uuid4().hex] = _Entry(fingerprint, _normalize(vector), question, answer, sources)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_answer_cache() -> SemanticAnswerCache:
+    return SemanticAnswerCache()
@@ -1,6 +1,15 @@
 import re
 
+_WHITESPACE = re.compile(r'\s+')
+
 def preprocess_text(text: str) -> str:
     # Basic cleaning: remove excessive whitespace
-    cleaned = re.sub(r'\s+', ' ', text)
+    cleaned = _WHITESPACE.sub(' ', text)
     return cleaned.strip()
+
+def iter_preprocessed_pages(pages):
+    # Clean page by page so the whole document never has to sit in one string
+    for page_number, text in pages:
+        cleaned = preprocess_text(text)
+        if cleaned:
+            yield page_number, cleaned
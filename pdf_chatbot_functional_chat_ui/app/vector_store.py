@@ -1,8 +1,107 @@
+import heapq
+
+from langchain.docstore.document import Document
 from langchain.vectorstores import FAISS
-from langchain.embeddings.openai import OpenAIEmbeddings
+from langchain.vectorstores.base import VectorStore
+
+EMBED_BATCH_SIZE = 256
 
-def create_vector_store(chunks, embedding_model):
+def create_vector_store(chunks, embedding_model, metadatas=None):
     print("📌 [Vector Store] Creating FAISS index...")
-    vector_store = FAISS.from_texts(chunks, embedding_model)
+    vector_store = FAISS.from_texts(chunks, embedding_model, metadatas=metadatas)
     print("✅ [Vector Store] FAISS index created.")
     return vector_store
+
+def create_vector_store_from_chunks(chunk_stream, embedding_model, batch_size=EMBED_BATCH_SIZE, progress_callback=None):
+    """Build a FAISS index from an iterable of (chunk, metadata), embedding one batch at a time.
+
+    progress_callback, if given, is called with the number of chunks embedded so far.
+    """
+    print("📌 [Vector Store] Creating FAISS index from chunk stream...")
+    vector_store = None
+    texts, metadatas = [], []
+    total = 0
+
+    def flush():
+        nonlocal vector_store
+        if vector_store is None:
+            vector_store = FAISS.from_texts(texts, embedding_model, metadatas=metadatas)
+        else:
+            vector_store.add_texts(texts, metadatas=metadatas)
+
+    for chunk, metadata in chunk_stream:
+        texts.append(chunk)
+        metadatas.append(metadata)
+        if len(texts) >= batch_size:
+            flush()
+            total += len(texts)
+            texts, metadatas = [], []
+            if progress_callback:
+                progress_callback(total)
+    if texts:
+        flush()
+        total += len(texts)
+        if progress_callback:
+            progress_callback(total)
+
+    if vector_store is None:
+        raise ValueError("No text could be extracted from the document.")
+    print(f"✅ [Vector Store] FAISS index created with {total} chunks.")
+    return vector_store
+
+class DocumentSet(VectorStore):
+    """Read-only search over the shared per-document indexes of one session.
+
+    Sessions hold references to the document store's indexes rather than copies
+    of their vectors: every query runs against each document and the hits are
+    merged by L2 distance. Adding or removing a document returns a new set.
+    """
+
+    def __init__(self, embedding_model, documents=None):
+        self.embedding_model = embedding_model
+        self.documents = dict(documents or {})  # doc_id -> shared FAISS store
+
+    @property
+    def embeddings(self):
+        return self.embedding_model
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        hits = []
+        for doc_id, document_store in self.documents.items():
+            for document, score in document_store.similarity_search_with_score_by_vector(embedding, k=k):
+                if "doc_id" not in document.metadata:
+                    # Indexes stored before multi-PDF support lack the per-document tag
+                    document = Document(page_content=document.page_content,
+                                        metadata={**document.metadata, "doc_id": doc_id})
+                hits.append((document, score))
+        return heapq.nsmallest(k, hits, key=lambda hit: hit[1])
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k=k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self.embedding_model.embed_query(query), k=k)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("DocumentSet is read-only; use add_document() with a stored index")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("DocumentSet is built from stored indexes with add_document()")
+
+def add_document(vector_store, document_store, doc_id, embedding_model):
+    """Return a new session set with a shared per-document index added.
+
+    document_store is shared by every session and only ever searched, so no
+    vectors are copied or re-embedded.
+    """
+    documents = dict(vector_store.documents) if vector_store is not None else {}
+    documents[doc_id] = document_store
+    print(f"✅ [Vector Store] Added document {doc_id[:12]} ({document_store.index.ntotal} chunks).")
+    return DocumentSet(embedding_model, documents)
+
+def remove_document(vector_store, doc_id):
+    """Return a new session set without doc_id, or None once no document is left."""
+    documents = {key: store for key, store in vector_store.documents.items() if key != doc_id}
+    print(f"🗑️ [Vector Store] Removed document {doc_id[:12]}.")
+    return DocumentSet(vector_store.embedding_model, documents) if documents else None
@@ -0,0 +1,293 @@
+"""Offline benchmark for the PDF chatbot ingestion and query path.
+
+Runs extract -> preprocess -> chunk -> embed/index -> answer on a synthetic PDF
+with a deterministic fake embedding model and a fake chat model, so no network
+or API key is needed.
+
+    python benchmark.py run --pages 200 --output bench_new.json
+    python benchmark.py compare bench_old.json bench_new.json --threshold 0.10
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import fitz  # PyMuPDF
+from langchain.chat_models.fake import FakeListChatModel
+from langchain.embeddings.base import Embeddings
+from langchain.memory import ConversationBufferMemory
+
+from app.chunker import iter_chunks
+from app.pdf_extractor import iter_pdf_pages
+from app.runtime import ChatRuntime
+from app.text_preprocessor import iter_preprocessed_pages
+from app.vector_store import create_vector_store_from_chunks
+
+try:
+    import psutil
+except ImportError:  # optional; /proc is read directly on Linux
+    psutil = None
+
+VOCABULARY = (
+    "cell membrane protein enzyme energy gradient diffusion osmosis equilibrium reaction "
+    "molecule structure function theory model equation variable derivative integral limit "
+    "history revolution economy policy market demand supply network algorithm complexity"
+).split()
+
+
+class DeterministicFakeEmbeddings(Embeddings):
+    """Hashes tokens into a fixed-size unit vector: same text, same vector, no network."""
+
+    def __init__(self, size=256):
+        self.size = size
+
+    def _embed(self, text):
+        vector = [0.0] * self.size
+        for token in text.lower().split():
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def make_synthetic_pdf(path, pages, words_per_page, seed=0):
+    rng = random.Random(seed)
+    with fitz.open() as doc:
+        for number in range(pages):
+            page = doc.new_page()
+            words = [rng.choice(VOCABULARY) for _ in range(words_per_page)]
+            text = f"Chapter {number + 1}\n" + " ".join(words)
+            page.insert_textbox(fitz.Rect(36, 36, page.rect.width - 36, page.rect.height - 36), text, fontsize=7)
+        doc.save(path)
+
+
+def _proc_rss_bytes(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _proc_children(pid):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def current_rss_mb():
+    """Resident memory of this process plus its extraction workers, or None if it cannot be read."""
+    if psutil is not None:
+        process = psutil.Process()
+        processes = [process] + process.children(recursive=True)
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass  # worker exited between listing and reading
+        return total / (1024 * 1024)
+    if not os.path.exists("/proc/self/statm"):
+        return None
+    total, pending = 0, [os.getpid()]
+    while pending:
+        pid = pending.pop()
+        try:
+            total += _proc_rss_bytes(pid)
+            pending.extend(_proc_children(pid))
+        except OSError:
+            pass
+    return total / (1024 * 1024)
+
+
+class RSSSampler:
+    """Samples RSS in a background thread while a stage runs.
+
+    ru_maxrss is a process-lifetime high-water mark, so every stage after the
+    hungriest one would report the same number; sampling gives each stage its
+    own peak and its growth over the RSS it started with.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_mb = self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None:
+                self.peak_mb = max(self.peak_mb, rss)
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = current_rss_mb()
+        if self.start_mb is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+            self.peak_mb = max(self.peak_mb, current_rss_mb() or 0.0)
+
+
+def timed(results, stage, fn, items=None):
+    with RSSSampler() as rss:
+        start = time.perf_counter()
+        value = fn()
+        seconds = time.perf_counter() - start
+    count = items(value) if items else None
+    measured = rss.peak_mb is not None
+    results[stage] = {
+        "wall_seconds": round(seconds, 4),
+        "peak_rss_mb": round(rss.peak_mb, 1) if measured else None,
+        "rss_growth_mb": round(rss.peak_mb - rss.start_mb, 1) if measured else None,
+        "items": count,
+        "items_per_second": round(count / seconds, 1) if count and seconds else None,
+    }
+    print(f"⏱️ [{stage}] {seconds:.3f} s" + (f", {count} items" if count is not None else ""))
+    return value
+
+
+def run(args):
+    embeddings = DeterministicFakeEmbeddings()
+    rng = random.Random(args.seed)
+    queries = [f"Explain the {rng.choice(VOCABULARY)} of {rng.choice(VOCABULARY)}" for _ in range(args.queries)]
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "synthetic.pdf")
+        timed(stages, "make_pdf", lambda: make_synthetic_pdf(pdf_path, args.pages, args.words_per_page, args.seed))
+
+        # Stage-by-stage, materializing each step so it can be timed on its own
+        pages = timed(stages, "extract", lambda: list(iter_pdf_pages(pdf_path, max_workers=args.workers)), len)
+        cleaned = timed(stages, "preprocess", lambda: list(iter_preprocessed_pages(pages)), len)
+        chunks = timed(stages, "chunk", lambda: list(iter_chunks(cleaned)), len)
+        vector_store = timed(
+            stages, "embed_index", lambda: create_vector_store_from_chunks(iter(chunks), embeddings),
+            lambda store: store.index.ntotal,
+        )
+        del pages, cleaned, chunks
+
+        # The streaming path the app actually uses, end to end
+        timed(
+            stages, "ingest_streaming",
+            lambda: create_vector_store_from_chunks(
+                iter_chunks(iter_preprocessed_pages(iter_pdf_pages(pdf_path, max_workers=args.workers))), embeddings
+            ),
+            lambda store: store.index.ntotal,
+        )
+
+    llm = FakeListChatModel(responses=["This is a synthetic benchmark answer about the document."])
+    runtime = ChatRuntime(llm=llm, plain_llm=llm)
+    runtime.set_vector_store(vector_store)
+    per_query = []
+
+    def answer_all():
+        for query in queries:
+            # Fresh memory per query keeps every turn a single-shot retrieval + answer
+            memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+            start = time.perf_counter()
+            runtime.answer(query, memory)
+            per_query.append(time.perf_counter() - start)
+        return per_query
+
+    timed(stages, "query", answer_all, len)
+    stages["query"]["p50_ms"] = round(statistics.median(per_query) * 1000, 2)
+    stages["query"]["p95_ms"] = round(sorted(per_query)[int(0.95 * (len(per_query) - 1))] * 1000, 2)
+    runtime.close()
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "func"},
+        "stages": stages,
+        "created_at": time.time(),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark written to {args.output}")
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["stages"]
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)["stages"]
+
+    regressions = []
+    print(f"{'stage':<18}{'baseline s':>12}{'candidate s':>13}{'change':>10}"
+          f"{'base +MB':>10}{'cand +MB':>10}{'change':>10}")
+    for stage, old in baseline.items():
+        new = candidate.get(stage)
+        if new is None:
+            continue
+        before, after = old["wall_seconds"], new["wall_seconds"]
+        change = (after - before) / before if before else 0.0
+        flags = []
+        if change > args.threshold:
+            regressions.append(f"{stage} (time)")
+            flags.append("time")
+
+        # Memory is compared on each stage's own growth, not the process-wide level
+        rss_before, rss_after = old.get("rss_growth_mb"), new.get("rss_growth_mb")
+        rss_change = ""
+        if rss_before is not None and rss_after is not None:
+            rss_ratio = (rss_after - rss_before) / rss_before if rss_before > 0 else 0.0
+            rss_change = f"{rss_ratio:+.1%}"
+            # Small absolute changes are allocator noise, whatever the ratio
+            if rss_after - rss_before > args.rss_min_mb and rss_ratio > args.rss_threshold:
+                regressions.append(f"{stage} (rss)")
+                flags.append("rss")
+        flag = f"  ❌ {'+'.join(flags)}" if flags else ""
+        print(f"{stage:<18}{before:>12.3f}{after:>13.3f}{change:>+10.1%}"
+              f"{str(rss_before):>10}{str(rss_after):>10}{rss_change:>10}{flag}")
+
+    if regressions:
+        print(f"❌ Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ No regressions.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(required=True)
+
+    run_parser = subparsers.add_parser("run", help="benchmark the pipeline on a synthetic PDF")
+    run_parser.add_argument("--pages", type=int, default=100)
+    run_parser.add_argument("--words-per-page", type=int, default=400)
+    run_parser.add_argument("--queries", type=int, default=20)
+    run_parser.add_argument("--workers", type=int, default=None, help="extraction processes (default: CPU count)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", default="bench_results.json")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two benchmark result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown per stage")
+    compare_parser.add_argument("--rss-threshold", type=float, default=0.20,
+                                help="allowed relative growth of a stage's RSS increase")
+    compare_parser.add_argument("--rss-min-mb", type=float, default=5.0,
+                                help="RSS increases smaller than this many MB are never flagged")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
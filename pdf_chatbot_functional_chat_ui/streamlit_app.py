@@ -1,18 +1,17 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from tempfile import NamedTemporaryFile
 
 # App modules
-from app.pdf_extractor import extract_text_from_pdf
-from app.text_preprocessor import preprocess_text
-from app.chunker import chunk_text
 from app.embedder import get_embeddings
-from app.vector_store import create_vector_store
+from app.embedding_cache import get_embedding_cache
+from app.ingestion import STAGES, get_ingestion_queue
+from app.vector_store import add_document, remove_document
+from app.document_store import corpus_fingerprint, fingerprint_bytes, get_document_store
 from app.response import get_response
-
-from langchain.memory import ConversationBufferMemory
-from langchain.chat_models import ChatOpenAI
+from app.runtime import ChatRuntime
+from app.semantic_cache import get_answer_cache
+from app.memory import SummarizingMemory
 
 # Load environment variables
 load_dotenv()
@@ -22,50 +21,175 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 st.set_page_config(page_title="🧠 AI Tutor Chatbot", layout="wide", page_icon="🤖")
 st.title("🤖 EduGenie : AI Tutor Chatbot + PDF Q&A")
 
-st.sidebar.title("🧾 Upload PDF (Optional)")
-uploaded_file = st.sidebar.file_uploader("Upload course material (PDF)", type=["pdf"])
+st.sidebar.title("🧾 Upload PDFs (Optional)")
+uploaded_files = st.sidebar.file_uploader("Upload course material (PDF)", type=["pdf"], accept_multiple_files=True)
 
 # Shared memory for chat history
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 if "vector_store" not in st.session_state:
     st.session_state.vector_store = None
+if "runtime" not in st.session_state:
+    st.session_state.runtime = ChatRuntime(answer_cache=get_answer_cache())
 if "memory" not in st.session_state:
-    st.session_state.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    # Summaries go through the runtime's pooled HTTP client
+    st.session_state.memory = SummarizingMemory(http_client=st.session_state.runtime.http_client)
+if "embeddings" not in st.session_state:
+    st.session_state.embeddings = get_embeddings()
+# fingerprint -> file name of every document searched by the session
+if "documents" not in st.session_state:
+    st.session_state.documents = {}
+
+# fingerprint -> file name of uploads still being ingested in the background
+if "pending" not in st.session_state:
+    st.session_state.pending = {}
+
+# fingerprint -> (file name, error) of uploads whose ingestion failed; retried only on request
+if "failed" not in st.session_state:
+    st.session_state.failed = {}
+
+embeddings = st.session_state.embeddings
+ingestion_queue = get_ingestion_queue()
+
+
+def update_runtime():
+    if not st.session_state.documents:
+        st.session_state.vector_store = None
+    st.session_state.runtime.set_vector_store(
+        st.session_state.vector_store,
+        fingerprint=corpus_fingerprint(st.session_state.documents),
+        embeddings=embeddings,
+    )
+
+
+# Keep the session index in sync with the uploader: queue new files, drop removed ones
+uploaded = {fingerprint_bytes(f.getvalue()): f for f in uploaded_files or []}
+
+removed = [fp for fp in st.session_state.documents if fp not in uploaded]
+for fingerprint in removed:
+    st.session_state.vector_store = remove_document(st.session_state.vector_store, fingerprint)
+    del st.session_state.documents[fingerprint]
+if removed:
+    update_runtime()
+for fingerprint in [fp for fp in st.session_state.pending if fp not in uploaded]:
+    del st.session_state.pending[fingerprint]
+for fingerprint in [fp for fp in st.session_state.failed if fp not in uploaded]:
+    del st.session_state.failed[fingerprint]
 
-# If PDF uploaded: process it
-if uploaded_file:
-    with st.spinner("Processing PDF..."):
-        with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(uploaded_file.read())
-            pdf_path = tmp_file.name
+for fingerprint, (file_name, error) in list(st.session_state.failed.items()):
+    st.sidebar.error(f"❌ {file_name}: {error}")
+    if st.sidebar.button(f"🔁 Retry {file_name}", key=f"retry-{fingerprint}"):
+        del st.session_state.failed[fingerprint]
 
-        raw_text = extract_text_from_pdf(pdf_path)
-        cleaned_text = preprocess_text(raw_text)
-        chunks = chunk_text(cleaned_text)
+for fingerprint, uploaded_file in uploaded.items():
+    if (fingerprint in st.session_state.documents or fingerprint in st.session_state.pending
+            or fingerprint in st.session_state.failed):
+        continue
+    ingestion_queue.submit(uploaded_file.getvalue(), uploaded_file.name, embeddings)
+    st.session_state.pending[fingerprint] = uploaded_file.name
 
-        embeddings = get_embeddings()
-        vector_store = create_vector_store(chunks, embeddings)
 
-        st.session_state.vector_store = vector_store
-        st.success("✅ PDF uploaded and ready for Q&A!")
+def sync_ingestion():
+    """Add finished ingestion jobs to the session index and show progress for the rest."""
+    added = False
+    for fingerprint, file_name in list(st.session_state.pending.items()):
+        job = ingestion_queue.get(fingerprint)
+        if job is None or job.status == "failed":
+            error = job.error if job else "ingestion job lost"
+            st.error(f"❌ {file_name}: {error}")
+            # Kept out of the queue until the user asks for a retry, instead of on every rerun
+            st.session_state.failed[fingerprint] = (file_name, error)
+            del st.session_state.pending[fingerprint]
+        elif job.status == "done":
+            document_store = get_document_store().load(fingerprint, embeddings)
+            st.session_state.vector_store = add_document(
+                st.session_state.vector_store, document_store, fingerprint, embeddings
+            )
+            st.session_state.documents[fingerprint] = file_name
+            del st.session_state.pending[fingerprint]
+            added = True
+            st.success(f"✅ {file_name} added and ready for Q&A!")
+        else:
+            st.markdown(f"⏳ **{file_name}** ({job.stage or job.status})")
+            for stage in STAGES:
+                st.progress(min(job.progress[stage], 1.0), text=stage)
+    if added:
+        update_runtime()
+
+    if st.session_state.documents:
+        st.markdown("**📚 Indexed documents**")
+        for name in st.session_state.documents.values():
+            st.markdown(f"- {name}")
+
+
+# Poll job status without blocking the chat; older Streamlit falls back to a refresh button
+with st.sidebar:
+    if hasattr(st, "fragment"):
+        st.fragment(run_every=2)(sync_ingestion)()
+    else:
+        sync_ingestion()
+        if st.session_state.pending:
+            st.button("🔄 Refresh ingestion status")
+
+# Embedding cache savings
+cache_stats = get_embedding_cache().stats()
+st.sidebar.caption(
+    f"🗃️ Embedding cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+    f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']} chunks stored)"
+)
+answer_stats = get_answer_cache().stats()
+st.sidebar.caption(
+    f"💡 Answer cache: {answer_stats['hits']} hits / {answer_stats['misses']} misses "
+    f"({answer_stats['entries']} answers stored)"
+)
+
+stream_answers = st.sidebar.checkbox("Stream answers", value=True)
 
 st.markdown("### 💬 Ask Your AI Tutor")
 with st.form("chat_form", clear_on_submit=True):
     user_input = st.text_input("Ask a question (about the PDF or anything else):")
+    follow_up = st.checkbox("Follow-up question (skip the shared answer cache)")
     submitted = st.form_submit_button("Send")
 
     if submitted and user_input:
-        with st.spinner("Thinking..."):
+        if stream_answers:
             if st.session_state.vector_store:
-                # Use RAG with vector store
-                response = get_response(user_input, st.session_state.vector_store, st.session_state.memory)
+                tokens = get_response(
+                    user_input, st.session_state.vector_store, st.session_state.memory,
+                    st.session_state.runtime, stream=True, bypass_cache=follow_up
+                )
             else:
-                # Use plain LLM (ChatGPT-like response)
-                llm = ChatOpenAI(temperature=0.7, openai_api_key=OPENAI_API_KEY)
-                response = llm.predict(user_input)
+                tokens = st.session_state.runtime.stream_plain(user_input)
+
+            # Render the answer incrementally as tokens arrive
+            st.markdown(f"**👤 You:** {user_input}")
+            placeholder = st.empty()
+            response = ""
+            for token in tokens:
+                response += token
+                placeholder.markdown(f"**🤖 EduGenie:** {response}▌")
+            placeholder.markdown(f"**🤖 EduGenie:** {response}")
 
             st.session_state.chat_history.append((user_input, response))
+        else:
+            with st.spinner("Thinking..."):
+                if st.session_state.vector_store:
+                    # Use RAG with vector store
+                    response = get_response(
+                        user_input, st.session_state.vector_store, st.session_state.memory,
+                        st.session_state.runtime, bypass_cache=follow_up
+                    )
+                else:
+                    # Use plain LLM (ChatGPT-like response)
+                    response = st.session_state.runtime.predict_plain(user_input)
+
+                st.session_state.chat_history.append((user_input, response))
+
+        timings = st.session_state.runtime.last_timings
+        st.caption(
+            "⏱️ " + " · ".join(f"{stage}: {seconds * 1000:.0f} ms" for stage, seconds in timings.items())
+            + f" · 🧠 {st.session_state.memory.last_tokens_saved} history tokens saved"
+        )
 
 # Show chat history
 if st.session_state.chat_history: